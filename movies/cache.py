@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import asyncpg
+
+from config import settings
+from logger import logger
+from metrics import (
+    RESPONSE_CACHE_EVICTIONS_TOTAL, RESPONSE_CACHE_HITS_TOTAL, RESPONSE_CACHE_MISSES_TOTAL,
+    SEARCH_CACHE_REDIS_ERRORS_TOTAL,
+)
+
+ENTRY_CHANGED_CHANNEL = "entry_changed"
+RELATED_CHANGED_CHANNEL = "related_changed"
+FRANCHISE_CHANGED_CHANNEL = "franchise_changed"
+INDEX_CHANGED_CHANNEL = "search_index_changed"
+
+
+class ResponseCache:
+    """Ограниченный LRU-кеш с TTL для готовых (сериализованных) ответов.
+
+    Кеш живёт внутри процесса API и сбрасывается по уведомлениям из Postgres.
+    Чтобы не положить в кеш ответ, собранный до параллельной инвалидации,
+    заполнение идёт по токену из fill_token(): если после его получения была
+    инвалидация, set() ничего не сохраняет.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._dependents: dict[Hashable, set[Hashable]] = {}
+        # обратная связь: из каких множеств _dependents убрать ключ при вытеснении
+        self._dependencies: dict[Hashable, set[Hashable]] = {}
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            RESPONSE_CACHE_MISSES_TOTAL.labels(cache=self.name).inc()
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._evict(key, "expired")
+            RESPONSE_CACHE_MISSES_TOTAL.labels(cache=self.name).inc()
+            return None
+
+        self._items.move_to_end(key)
+        RESPONSE_CACHE_HITS_TOTAL.labels(cache=self.name).inc()
+        return value
+
+    def fill_token(self) -> int:
+        return self._invalidations
+
+    def set(self, key: Hashable, value: Any, token: int, depends_on: Iterable[Hashable] = ()) -> None:
+        """Сохранить value; depends_on — ключи, при инвалидации которых запись тоже сбрасывается"""
+        if token != self._invalidations:
+            return
+
+        self._evict(key, None)
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        for dependency in depends_on:
+            self._dependents.setdefault(dependency, set()).add(key)
+            self._dependencies.setdefault(key, set()).add(dependency)
+
+        while len(self._items) > self.maxsize:
+            oldest_key = next(iter(self._items))
+            self._evict(oldest_key, "capacity")
+
+    def invalidate(self, key: Hashable) -> None:
+        self._invalidations += 1
+        self._evict(key, "invalidated")
+
+    def invalidate_dependents(self, dependency: Hashable) -> None:
+        self._invalidations += 1
+        for key in self._dependents.pop(dependency, set()):
+            self._evict(key, "invalidated")
+
+    def clear(self) -> None:
+        self._invalidations += 1
+        for key in list(self._items):
+            self._evict(key, "invalidated")
+        self._dependents.clear()
+        self._dependencies.clear()
+
+    def _evict(self, key: Hashable, reason: Optional[str]) -> None:
+        for dependency in self._dependencies.pop(key, ()):
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
+
+        if self._items.pop(key, None) is not None and reason:
+            RESPONSE_CACHE_EVICTIONS_TOTAL.labels(cache=self.name, reason=reason).inc()
+
+
+class SearchCache:
+    """Кеш результатов поиска: ResponseCache в процессе и, если задан redis_url, общий кеш в Redis.
+
+    Ключ содержит поколение индекса — позиции watermark журналов sync_worker.
+    Все экземпляры API получают одни и те же уведомления search_index_changed,
+    поэтому поколение у них совпадает, а ключи старого поколения в Redis
+    просто истекают по TTL. Пока поколение неизвестно (нет соединения
+    с Postgres), кеш не используется.
+    """
+
+    def __init__(self, local: ResponseCache, redis_url: Optional[str]) -> None:
+        self.local = local
+        self.redis_url = redis_url
+        self.redis = None
+        self._watermarks: Optional[Dict[str, Tuple[int, int]]] = None
+
+    async def start(self) -> None:
+        if self.redis_url:
+            # redis нужен только для общего кеша
+            from redis.asyncio import Redis
+
+            self.redis = Redis.from_url(self.redis_url)
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    def reset(self, watermarks: Optional[Dict[str, Tuple[int, int]]]) -> None:
+        """Начать поколение заново: после (пере)подключения к Postgres или при его потере"""
+        self._watermarks = watermarks
+        self.local.clear()
+
+    def advance(self, name: str, position: Tuple[int, int]) -> None:
+        if self._watermarks is None or self._watermarks.get(name, (0, 0)) >= position:
+            return
+        self._watermarks[name] = position
+        self.local.clear()
+
+    def key(self, request_key: Hashable) -> Optional[str]:
+        if self._watermarks is None:
+            return None
+        generation = repr(sorted(self._watermarks.items()))
+        digest = hashlib.sha1(repr((generation, request_key)).encode()).hexdigest()
+        return f"search:{digest}"
+
+    def fill_token(self) -> int:
+        return self.local.fill_token()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None or self.redis is None:
+            return value
+
+        try:
+            value = await self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Search cache Redis get failed: {e}")
+            SEARCH_CACHE_REDIS_ERRORS_TOTAL.inc()
+            return None
+
+        if value is None:
+            RESPONSE_CACHE_MISSES_TOTAL.labels(cache="search_redis").inc()
+            return None
+        RESPONSE_CACHE_HITS_TOTAL.labels(cache="search_redis").inc()
+        self.local.set(key, value, self.local.fill_token())
+        return value
+
+    async def set(self, key: str, value: bytes, token: int) -> None:
+        if token != self.local.fill_token():
+            return
+        self.local.set(key, value, token)
+        if self.redis is None:
+            return
+
+        try:
+            await self.redis.set(key, value, ex=max(1, int(self.local.ttl)))
+        except Exception as e:
+            logger.warning(f"Search cache Redis set failed: {e}")
+            SEARCH_CACHE_REDIS_ERRORS_TOTAL.inc()
+
+
+entry_cache = ResponseCache("entry", settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+franchise_cache = ResponseCache("franchise", settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+search_cache = SearchCache(
+    ResponseCache("search", settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL),
+    settings.SEARCH_CACHE_REDIS_URL,
+)
+
+
+async def listen_for_invalidations(dsn: str, retry_delay: float = 5) -> None:
+    """Фоновая задача API: слушает entry_changed, related_changed, franchise_changed,
+    search_index_changed и сбрасывает кеши ответов"""
+    while True:
+        conn = None
+
+        def on_entry_changed(conn, pid, channel, payload):
+            entry_id, franchise_id = payload.split(":")
+            entry_id = int(entry_id)
+            # entry кешируется отдельно для каждого представления (?lang=, ?fields=, ?include=)
+            entry_cache.invalidate_dependents(entry_id)
+            # франшиза отдаёт краткие карточки своих entries: сбрасываем ту, где entry уже закеширован,
+            # и ту, к которой entry относится сейчас (например, только что созданный)
+            franchise_cache.invalidate_dependents(entry_id)
+            if franchise_id:
+                franchise_cache.invalidate(int(franchise_id))
+
+        def on_franchise_changed(conn, pid, channel, payload):
+            franchise_cache.invalidate(int(payload))
+
+        def on_related_changed(conn, pid, channel, payload):
+            entity, entity_id = payload.split(":")
+            if entity == "franchise":
+                franchise_cache.invalidate(int(entity_id))
+            elif entity == "genre":
+                # название жанра есть в ответе каждого его entry; связи жанр -> entries кеш не хранит
+                entry_cache.clear()
+
+        def on_index_changed(conn, pid, channel, payload):
+            name, txid, change_id = payload.rsplit(":", 2)
+            search_cache.advance(name, (int(txid), int(change_id)))
+
+        try:
+            conn = await asyncpg.connect(dsn=dsn)
+            await conn.add_listener(ENTRY_CHANGED_CHANNEL, on_entry_changed)
+            await conn.add_listener(RELATED_CHANGED_CHANNEL, on_related_changed)
+            await conn.add_listener(FRANCHISE_CHANGED_CHANNEL, on_franchise_changed)
+            await conn.add_listener(INDEX_CHANGED_CHANNEL, on_index_changed)
+            # пока соединения не было, уведомления могли потеряться
+            entry_cache.clear()
+            franchise_cache.clear()
+            # поколение — после LISTEN: уведомления, пришедшие раньше ответа, advance не откатит
+            watermarks = await conn.fetch("SELECT name, txid, change_id FROM sync_watermarks")
+            search_cache.reset({row["name"]: (row["txid"], row["change_id"]) for row in watermarks})
+            logger.info(
+                f"Response cache is listening on '{ENTRY_CHANGED_CHANNEL}', '{RELATED_CHANGED_CHANNEL}', "
+                f"'{FRANCHISE_CHANGED_CHANNEL}', '{INDEX_CHANGED_CHANNEL}'"
+            )
+
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            await closed.wait()
+            logger.warning("Response cache listener connection closed, reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Response cache listener failed: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+
+        entry_cache.clear()
+        franchise_cache.clear()
+        search_cache.reset(None)
+        await asyncio.sleep(retry_delay)
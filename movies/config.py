@@ -7,10 +7,61 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_NAME: str
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    ELASTICSEARCH_URL: str = "http://elasticsearch:9200"
+    ES_REQUEST_TIMEOUT: float = 5
+    ES_MAX_RETRIES: int = 2
+    ES_CONNECTIONS_PER_NODE: int = 20
+    ES_MAX_CONCURRENT_SEARCHES: int = 50
+    ES_QUEUE_TIMEOUT: float = 1
+    # реплики индекса entries после полной переиндексации (во время загрузки — 0)
+    ES_NUMBER_OF_REPLICAS: int = 1
+
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL: float = 300
+    # Кеш результатов поиска. Сбрасывается, когда sync_worker записал изменения в ES;
+    # TTL покрывает refresh_interval индекса, за который запись ещё не видна поиску.
+    # С SEARCH_CACHE_REDIS_URL кеш общий для всех экземпляров API.
+    SEARCH_CACHE_SIZE: int = 2048
+    SEARCH_CACHE_TTL: float = 30
+    SEARCH_CACHE_REDIS_URL: str | None = None
+    HTTP_CACHE_MAX_AGE: int = 30
+
+    # sync_worker: после NOTIFY ждём SYNC_WINDOW_SECONDS (или SYNC_WINDOW_MAX_IDS уведомлений),
+    # затем читаем журнал entry_changes порциями по SYNC_CATCHUP_BATCH строк;
+    # без уведомлений журнал перечитывается раз в SYNC_CATCHUP_INTERVAL секунд
+    SYNC_WINDOW_SECONDS: float = 0.5
+    SYNC_WINDOW_MAX_IDS: int = 500
+    SYNC_CATCHUP_BATCH: int = 5000
+    SYNC_CATCHUP_INTERVAL: float = 30
+    # параллельные обработчики, размер пачки одного обработчика и очередь пачек перед ними
+    SYNC_CONSUMERS: int = 4
+    SYNC_BATCH_SIZE: int = 100
+    SYNC_QUEUE_SIZE: int = 16
+
+    # цепочка языков, которая добавляется после запрошенного ?lang=
+    FALLBACK_LANGUAGES: str = "ru,en"
+
+    # поля документа entries, которые поиск запрашивает у ES (_source includes)
+    SEARCH_SOURCE_FIELDS: str = "id,type,status,year,locales.language,locales.title,genres.name"
+    # сколько ES держит point-in-time между страницами поиска с ?pit=true
+    SEARCH_PIT_KEEP_ALIVE: str = "1m"
+
     @property
     def DATABASE_URL(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def POSTGRES_DSN(self):
+        return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,7 @@
 from datetime import datetime, date, UTC
 from typing import List, Optional
-from sqlalchemy import String, Text, Integer, SmallInteger, Date, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Text, Integer, BigInteger, SmallInteger, Date, DateTime, ForeignKey, Index, Enum as SQLEnum, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 import enum
 
@@ -40,7 +41,8 @@ class Franchise(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
 
     locales: Mapped[List["FranchiseLocale"]] = relationship(back_populates="franchise", cascade="all, delete-orphan", lazy="selectin")
-    entries: Mapped[List["Entry"]] = relationship(back_populates="franchise", cascade="all, delete-orphan", lazy="selectin")
+    entries: Mapped[List["Entry"]] = relationship(back_populates="franchise", cascade="all, delete-orphan",
+                                                  passive_deletes=True, order_by="Entry.entry_number")
 
 class FranchiseLocale(Base):
     __tablename__ = "franchise_locales"
@@ -75,7 +77,8 @@ class Entry(Base):
 
     franchise: Mapped["Franchise"] = relationship(back_populates="entries")
     locales: Mapped[List["EntryLocale"]] = relationship(back_populates="entry", cascade="all, delete-orphan")
-    episodes: Mapped[List["Episode"]] = relationship(back_populates="entry", cascade="all, delete-orphan")
+    episodes: Mapped[List["Episode"]] = relationship(back_populates="entry", cascade="all, delete-orphan",
+                                                     order_by="Episode.episode_number")
     genres: Mapped[List["Genre"]] = relationship(secondary="entry_genres", back_populates="entries")
     staff: Mapped[List["EntryStaff"]] = relationship(back_populates="entry", cascade="all, delete-orphan")
 
@@ -169,3 +172,81 @@ class EntryStaff(Base):
 
     entry: Mapped["Entry"] = relationship(back_populates="staff")
     person: Mapped["Person"] = relationship(back_populates="staff_entries")
+
+class EntryCard(Base):
+    """Денормализованная карточка entry для каталожных страниц.
+
+    Таблицу пишут только триггеры из scripts/init_db.py (refresh_entry_cards),
+    приложение её только читает.
+    """
+    __tablename__ = "entry_cards"
+
+    entry_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("entries.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    franchise_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    type: Mapped[EntryType] = mapped_column(SQLEnum(EntryType), nullable=False, index=True)
+    status: Mapped[ContentStatus] = mapped_column(SQLEnum(ContentStatus), nullable=False, index=True)
+    year: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    titles: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    genres: Mapped[List[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+class EntryChange(Base):
+    """Журнал изменений entries (outbox) для sync_worker; строки пишут триггеры из scripts/init_db.py.
+
+    txid — id транзакции-автора: журнал читается в порядке (txid, id) и только
+    до самой старой ещё открытой транзакции, поэтому поздно закоммиченные строки
+    не оказываются позади сохранённого watermark.
+    """
+    __tablename__ = "entry_changes"
+    __table_args__ = (Index("ix_entry_changes_txid_id", "txid", "id"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    # без внешнего ключа: удаление entry тоже должно попасть в журнал
+    entry_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    txid: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        server_default=text("pg_current_xact_id()::text::bigint")
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text("clock_timestamp()")
+    )
+
+class RelatedChange(Base):
+    """Журнал изменений персон, франшиз и жанров, затрагивающих документы многих entries.
+
+    sync_worker раскладывает такие изменения на затронутые entries и обновляет
+    в их документах только изменившиеся поля. Порядок чтения — как у entry_changes.
+    """
+    __tablename__ = "related_changes"
+    __table_args__ = (Index("ix_related_changes_txid_id", "txid", "id"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(Text, nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    txid: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        server_default=text("pg_current_xact_id()::text::bigint")
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text("clock_timestamp()")
+    )
+
+class SyncWatermark(Base):
+    """До какой позиции журнала (entry_changes, related_changes) изменения уже применены в Elasticsearch"""
+    __tablename__ = "sync_watermarks"
+
+    name: Mapped[str] = mapped_column(Text, primary_key=True)
+    txid: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    change_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now,
+                                                 onupdate=datetime.now)
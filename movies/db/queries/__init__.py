@@ -7,3 +7,5 @@ from .franchiselocale import *
 from .genre import *
 from .person import *
 from .entry_relations import *
+from .entry_card import *
+from .change_log import *
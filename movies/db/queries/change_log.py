@@ -0,0 +1,82 @@
+from typing import List, Tuple, Type, Union
+from sqlalchemy import BigInteger, Text, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import EntryChange, RelatedChange, SyncWatermark
+
+ChangeLog = Union[Type[EntryChange], Type[RelatedChange]]
+
+
+async def get_watermark(session: AsyncSession, name: str) -> Tuple[int, int]:
+    """(txid, change_id) последнего применённого изменения; (0, 0) — журнал ещё не читался"""
+    result = await session.execute(
+        select(SyncWatermark.txid, SyncWatermark.change_id).where(SyncWatermark.name == name)
+    )
+    row = result.one_or_none()
+    return (row.txid, row.change_id) if row else (0, 0)
+
+
+async def get_changes(session: AsyncSession, log: ChangeLog, after: Tuple[int, int],
+                      limit: int = 5000) -> List[Union[EntryChange, RelatedChange]]:
+    """Изменения журнала log после watermark в порядке (txid, id).
+
+    Строки транзакций не старше самой старой незавершённой не отдаются:
+    пока она не закончилась, перед ними ещё могут появиться её строки.
+    """
+    oldest_running_txid = func.pg_snapshot_xmin(func.pg_current_snapshot()).cast(Text).cast(BigInteger)
+    result = await session.execute(
+        select(log)
+        .where(
+            tuple_(log.txid, log.id) > tuple_(*after),
+            log.txid < oldest_running_txid,
+        )
+        .order_by(log.txid, log.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def notify_index_changed(session: AsyncSession, name: str, position: Tuple[int, int]) -> None:
+    """Сообщить API, что изменения до position уже в Elasticsearch; уведомление уходит при commit"""
+    txid, change_id = position
+    await session.execute(select(func.pg_notify("search_index_changed", f"{name}:{txid}:{change_id}")))
+
+
+async def _upsert_watermark(session: AsyncSession, name: str, position: Tuple[int, int]) -> None:
+    txid, change_id = position
+    await session.execute(
+        insert(SyncWatermark)
+        .values(name=name, txid=txid, change_id=change_id, updated_at=func.now())
+        .on_conflict_do_update(
+            index_elements=[SyncWatermark.name],
+            set_={"txid": txid, "change_id": change_id, "updated_at": func.now()},
+        )
+    )
+
+
+async def save_watermark(session: AsyncSession, name: str, log: ChangeLog, position: Tuple[int, int]) -> None:
+    """Сохранить watermark и удалить из журнала всё, что до него уже применено"""
+    txid, change_id = position
+    await _upsert_watermark(session, name, position)
+    await session.execute(
+        delete(log).where(tuple_(log.txid, log.id) <= tuple_(txid, change_id))
+    )
+    await session.commit()
+
+
+async def mark_reindexed(session: AsyncSession, name: str) -> None:
+    """Отметить полную переиндексацию: позиция — txid этой транзакции, уведомление API уходит при commit.
+
+    Позиция хранится рядом с watermark журналов, поэтому поколение кеша поиска,
+    прочитанное API после переподключения, тоже её учитывает.
+    """
+    # та же функция, что в DEFAULT txid журналов: позиции сравниваются одинаково
+    txid = (await session.execute(
+        select(func.pg_current_xact_id().cast(Text).cast(BigInteger))
+    )).scalar_one()
+    position = (txid, 0)
+    await _upsert_watermark(session, name, position)
+    await notify_index_changed(session, name, position)
+    await session.commit()
@@ -1,12 +1,188 @@
-from typing import List, Optional
+from typing import Collection, List, Optional, Sequence
+from sqlalchemy import JSON, String, func, literal, literal_column, text
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
 
-from db.models import Entry, Episode
+from db.models import Entry, EntryGenre, EntryLocale, EntryStaff, Episode, EpisodeLocale, Genre
 from schemas import EntryCreateRequest, EntryUpdateRequest
 
 
+def _json_array(json_object, order_by):
+    return func.coalesce(
+        func.json_agg(aggregate_order_by(json_object, *order_by)),
+        literal_column("'[]'::json"),
+        type_=JSON,
+    )
+
+
+ENTRY_RELATIONS = ("locales", "genres", "staff", "episodes")
+
+
+def _best_locale_id(locale_model, owner_key: str, languages: Sequence[str]):
+    """id локали того же владельца на первом языке цепочки languages, для которого она есть.
+
+    Если ни одного языка цепочки нет, берётся первая по id локаль — как в project_hit у поиска.
+    """
+    # alias, чтобы отличать строки подзапроса от строк внешнего select по той же таблице
+    locale = aliased(locale_model)
+    chain = literal(list(languages), ARRAY(String))
+    return (
+        select(locale.id)
+        .where(getattr(locale, owner_key) == getattr(locale_model, owner_key))
+        .order_by(func.array_position(chain, locale.language).nulls_last(), locale.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def _select_entry_details(relations: Collection[str] = ENTRY_RELATIONS, languages: Optional[Sequence[str]] = None):
+    """Entry вместе со связями, собранными в JSON-массивы одним SQL-запросом.
+
+    relations — какие связи вообще выбирать (остальные не попадают в SQL),
+    languages — цепочка языков: от entry и каждого эпизода берётся одна локаль
+    на первом доступном языке цепочки; None — все локали.
+    """
+    episode_locales = (
+        select(_json_array(
+            func.json_build_object(
+                "id", EpisodeLocale.id,
+                "episode_id", EpisodeLocale.episode_id,
+                "language", EpisodeLocale.language,
+                "title", EpisodeLocale.title,
+                "description", EpisodeLocale.description,
+            ),
+            [EpisodeLocale.id],
+        ))
+        .where(EpisodeLocale.episode_id == Episode.id)
+    )
+    if languages is not None:
+        episode_locales = episode_locales.where(
+            EpisodeLocale.id == _best_locale_id(EpisodeLocale, "episode_id", languages)
+        )
+    episode_locales = episode_locales.scalar_subquery()
+    episodes = (
+        select(_json_array(
+            func.json_build_object(
+                "id", Episode.id,
+                "entry_id", Episode.entry_id,
+                "episode_number", Episode.episode_number,
+                "duration", Episode.duration,
+                "premiere_world", Episode.premiere_world,
+                "premiere_digital", Episode.premiere_digital,
+                "created_at", Episode.created_at,
+                "locales", episode_locales,
+            ),
+            [Episode.episode_number, Episode.id],
+        ))
+        .where(Episode.entry_id == Entry.id)
+        .scalar_subquery()
+    )
+    locales = (
+        select(_json_array(
+            func.json_build_object(
+                "id", EntryLocale.id,
+                "entry_id", EntryLocale.entry_id,
+                "language", EntryLocale.language,
+                "title", EntryLocale.title,
+                "description", EntryLocale.description,
+            ),
+            [EntryLocale.id],
+        ))
+        .where(EntryLocale.entry_id == Entry.id)
+    )
+    if languages is not None:
+        locales = locales.where(
+            EntryLocale.id == _best_locale_id(EntryLocale, "entry_id", languages)
+        )
+    locales = locales.scalar_subquery()
+    genres = (
+        select(_json_array(
+            func.json_build_object("id", Genre.id, "name", Genre.name),
+            [Genre.id],
+        ))
+        .join(EntryGenre, EntryGenre.genre_id == Genre.id)
+        .where(EntryGenre.entry_id == Entry.id)
+        .scalar_subquery()
+    )
+    staff = (
+        select(_json_array(
+            func.json_build_object(
+                "entry_id", EntryStaff.entry_id,
+                "person_id", EntryStaff.person_id,
+                "role", EntryStaff.role,
+                "character_name", EntryStaff.character_name,
+            ),
+            [EntryStaff.person_id, EntryStaff.role],
+        ))
+        .where(EntryStaff.entry_id == Entry.id)
+        .scalar_subquery()
+    )
+
+    columns = {"locales": locales, "genres": genres, "staff": staff, "episodes": episodes}
+    return select(
+        Entry,
+        *(columns[name].label(name) for name in ENTRY_RELATIONS if name in relations),
+    ).execution_options(populate_existing=True)
+
+
+async def get_entry_details(session: AsyncSession, entry_ids: List[int],
+                            relations: Collection[str] = ENTRY_RELATIONS,
+                            languages: Optional[Sequence[str]] = None) -> List[Row]:
+    """Получить entries по списку id с нужными связями за один запрос"""
+    if not entry_ids:
+        return []
+
+    result = await session.execute(
+        _select_entry_details(relations, languages).where(Entry.id.in_(entry_ids))
+    )
+    return list(result.all())
+
+
+async def get_entry_version(session: AsyncSession, entry_id: int) -> Optional[Row]:
+    """Дешёвая проверка версии entry: md5 по строкам entry и всех его связей"""
+    result = await session.execute(
+        text("""
+        SELECT md5(concat_ws('|',
+                   e::text,
+                   (SELECT string_agg(l::text, ',' ORDER BY l.id)
+                      FROM entry_locales l WHERE l.entry_id = e.id),
+                   (SELECT string_agg(g::text, ',' ORDER BY g.id)
+                      FROM entry_genres eg JOIN genres g ON g.id = eg.genre_id
+                     WHERE eg.entry_id = e.id),
+                   (SELECT string_agg(s::text, ',' ORDER BY s.person_id, s.role)
+                      FROM entry_staff s WHERE s.entry_id = e.id),
+                   (SELECT string_agg(
+                               ep::text || '[' || COALESCE(
+                                   (SELECT string_agg(el::text, ',' ORDER BY el.id)
+                                      FROM episode_locales el WHERE el.episode_id = ep.id), '') || ']',
+                               ',' ORDER BY ep.id)
+                      FROM episodes ep WHERE ep.entry_id = e.id)
+               )) AS fingerprint
+          FROM entries e
+         WHERE e.id = :entry_id
+        """),
+        {"entry_id": entry_id}
+    )
+    return result.one_or_none()
+
+
+async def get_entries_details(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                              relations: Collection[str] = ENTRY_RELATIONS,
+                              languages: Optional[Sequence[str]] = None) -> List[Row]:
+    query = (
+        _select_entry_details(relations, languages)
+        .order_by(Entry.id)
+    )
+    if after_id is not None:
+        query = query.where(Entry.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
+    return list(result.all())
+
+
 async def get_entry(session: AsyncSession, entry_id: int) -> Optional[Entry]:
     result = await session.execute(
         select(Entry)
@@ -21,8 +197,8 @@ async def get_entry(session: AsyncSession, entry_id: int) -> Optional[Entry]:
     return result.scalar_one_or_none()
 
 
-async def get_entries(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Entry]:
-    result = await session.execute(
+async def get_entries(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Entry]:
+    query = (
         select(Entry)
         .options(
             selectinload(Entry.locales),
@@ -30,9 +206,12 @@ async def get_entries(session: AsyncSession, skip: int = 0, limit: int = 100) ->
             selectinload(Entry.genres),
             selectinload(Entry.staff)
         )
-        .offset(skip)
-        .limit(limit)
+        .order_by(Entry.id)
     )
+    if after_id is not None:
+        query = query.where(Entry.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
@@ -47,6 +226,32 @@ async def get_entries_by_franchise(session: AsyncSession, franchise_id: int) ->
     return list(result.scalars().all())
 
 
+async def get_entry_ids_by_franchise_ids(session: AsyncSession, franchise_ids: List[int]) -> List[int]:
+    result = await session.execute(
+        select(Entry.id)
+        .where(Entry.franchise_id.in_(franchise_ids))
+        .order_by(Entry.id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_franchise_ids_by_entry_ids(session: AsyncSession, entry_ids: List[int]) -> dict[int, int]:
+    """{entry_id: franchise_id} для указанных entries"""
+    result = await session.execute(
+        select(Entry.id, Entry.franchise_id).where(Entry.id.in_(entry_ids))
+    )
+    return {row.id: row.franchise_id for row in result.all()}
+
+
+async def get_existing_entry_ids(session: AsyncSession, entry_ids: List[int]) -> List[int]:
+    """Те из entry_ids, что ещё есть в базе"""
+    if not entry_ids:
+        return []
+
+    result = await session.execute(select(Entry.id).where(Entry.id.in_(set(entry_ids))))
+    return list(result.scalars().all())
+
+
 async def create_entry(session: AsyncSession, entry: EntryCreateRequest) -> Entry:
     db_entry = Entry(**entry.model_dump(exclude={'genres', 'staff'}))
     session.add(db_entry)
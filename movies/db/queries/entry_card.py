@@ -0,0 +1,19 @@
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import ContentStatus, EntryCard, EntryType
+
+
+async def get_entry_cards(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                          entry_type: Optional[EntryType] = None, status: Optional[ContentStatus] = None) -> List[EntryCard]:
+    query = select(EntryCard).order_by(EntryCard.entry_id)
+    if after_id is not None:
+        query = query.where(EntryCard.entry_id > after_id)
+    if entry_type is not None:
+        query = query.where(EntryCard.type == entry_type)
+    if status is not None:
+        query = query.where(EntryCard.status == status)
+
+    result = await session.execute(query.offset(skip).limit(limit))
+    return list(result.scalars().all())
@@ -46,6 +46,47 @@ async def get_entry_staff(session: AsyncSession, entry_id: int) -> List[tuple]:
     return staff_with_persons
 
 
+async def get_staff_by_entry_ids(session: AsyncSession, entry_ids: List[int]) -> List[EntryStaff]:
+    """Участники нескольких entries одним запросом, в порядке документов поиска"""
+    result = await session.execute(
+        select(EntryStaff)
+        .where(EntryStaff.entry_id.in_(entry_ids))
+        .order_by(EntryStaff.entry_id, EntryStaff.person_id, EntryStaff.role)
+    )
+    return list(result.scalars().all())
+
+
+async def get_genres_by_entry_ids(session: AsyncSession, entry_ids: List[int]) -> List[tuple]:
+    """Пары (entry_id, Genre) для нескольких entries одним запросом"""
+    result = await session.execute(
+        select(EntryGenre.entry_id, Genre)
+        .join(Genre, Genre.id == EntryGenre.genre_id)
+        .where(EntryGenre.entry_id.in_(entry_ids))
+        .order_by(EntryGenre.entry_id, Genre.id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def get_entry_ids_by_person_ids(session: AsyncSession, person_ids: List[int]) -> List[int]:
+    result = await session.execute(
+        select(EntryStaff.entry_id)
+        .where(EntryStaff.person_id.in_(person_ids))
+        .distinct()
+        .order_by(EntryStaff.entry_id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_entry_ids_by_genre_ids(session: AsyncSession, genre_ids: List[int]) -> List[int]:
+    result = await session.execute(
+        select(EntryGenre.entry_id)
+        .where(EntryGenre.genre_id.in_(genre_ids))
+        .distinct()
+        .order_by(EntryGenre.entry_id)
+    )
+    return list(result.scalars().all())
+
+
 async def add_entry_genres(
         session: AsyncSession,
         entry_id: int,
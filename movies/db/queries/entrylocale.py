@@ -16,13 +16,16 @@ async def get_entry_locale(session: AsyncSession, entry_locale_id: int) -> Optio
     return result.scalar_one_or_none()
 
 
-async def get_entry_locales(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[EntryLocale]:
-    result = await session.execute(
+async def get_entry_locales(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[EntryLocale]:
+    query = (
         select(EntryLocale)
         .options(selectinload(EntryLocale.entry))
-        .offset(skip)
-        .limit(limit)
+        .order_by(EntryLocale.id)
     )
+    if after_id is not None:
+        query = query.where(EntryLocale.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
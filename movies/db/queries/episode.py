@@ -19,16 +19,19 @@ async def get_episode(session: AsyncSession, episode_id: int) -> Optional[Episod
     return result.scalar_one_or_none()
 
 
-async def get_episodes(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Episode]:
-    result = await session.execute(
+async def get_episodes(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Episode]:
+    query = (
         select(Episode)
         .options(
             selectinload(Episode.locales),
             selectinload(Episode.entry)
         )
-        .offset(skip)
-        .limit(limit)
+        .order_by(Episode.id)
     )
+    if after_id is not None:
+        query = query.where(Episode.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
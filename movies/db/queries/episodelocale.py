@@ -16,13 +16,16 @@ async def get_episode_locale(session: AsyncSession, episode_locale_id: int) -> O
     return result.scalar_one_or_none()
 
 
-async def get_episode_locales(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[EpisodeLocale]:
-    result = await session.execute(
+async def get_episode_locales(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[EpisodeLocale]:
+    query = (
         select(EpisodeLocale)
         .options(selectinload(EpisodeLocale.episode))
-        .offset(skip)
-        .limit(limit)
+        .order_by(EpisodeLocale.id)
     )
+    if after_id is not None:
+        query = query.where(EpisodeLocale.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
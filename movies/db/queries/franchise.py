@@ -1,9 +1,11 @@
 from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from db.models import Franchise
+from db.models import Entry, Franchise
 from schemas import FranchiseCreateRequest
 
 
@@ -16,13 +18,52 @@ async def get_franchise(session: AsyncSession, franchise_id: int) -> Optional[Fr
     return result.scalar_one_or_none()
 
 
-async def get_franchises(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Franchise]:
+async def get_franchise_with_entries(session: AsyncSession, franchise_id: int) -> Optional[Franchise]:
+    """Франшиза с локалями и entries (с их локалями) — фиксированные 4 запроса"""
     result = await session.execute(
+        select(Franchise)
+        .options(
+            selectinload(Franchise.locales),
+            selectinload(Franchise.entries).selectinload(Entry.locales)
+        )
+        .where(Franchise.id == franchise_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_franchise_version(session: AsyncSession, franchise_id: int) -> Optional[Row]:
+    """Дешёвая проверка версии франшизы: md5 по франшизе, локалям и кратким entries"""
+    result = await session.execute(
+        text("""
+        SELECT md5(concat_ws('|',
+                   f::text,
+                   (SELECT string_agg(fl::text, ',' ORDER BY fl.id)
+                      FROM franchise_locales fl WHERE fl.franchise_id = f.id),
+                   (SELECT string_agg(
+                               e::text || '[' || COALESCE(
+                                   (SELECT string_agg(el::text, ',' ORDER BY el.id)
+                                      FROM entry_locales el WHERE el.entry_id = e.id), '') || ']',
+                               ',' ORDER BY e.id)
+                      FROM entries e WHERE e.franchise_id = f.id)
+               )) AS fingerprint
+          FROM franchises f
+         WHERE f.id = :franchise_id
+        """),
+        {"franchise_id": franchise_id}
+    )
+    return result.one_or_none()
+
+
+async def get_franchises(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Franchise]:
+    query = (
         select(Franchise)
         .options(selectinload(Franchise.locales))
-        .offset(skip)
-        .limit(limit)
+        .order_by(Franchise.id)
     )
+    if after_id is not None:
+        query = query.where(Franchise.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
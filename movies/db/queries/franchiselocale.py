@@ -16,13 +16,29 @@ async def get_franchise_locale(session: AsyncSession, franchise_locale_id: int)
     return result.scalar_one_or_none()
 
 
-async def get_franchise_locales(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[FranchiseLocale]:
+async def get_locales_by_franchise_ids(session: AsyncSession, franchise_ids: List[int]) -> List[FranchiseLocale]:
+    """Локали нескольких франшиз одним запросом (без связей)"""
+    if not franchise_ids:
+        return []
+
     result = await session.execute(
+        select(FranchiseLocale)
+        .where(FranchiseLocale.franchise_id.in_(set(franchise_ids)))
+        .order_by(FranchiseLocale.franchise_id, FranchiseLocale.id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_franchise_locales(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[FranchiseLocale]:
+    query = (
         select(FranchiseLocale)
         .options(selectinload(FranchiseLocale.franchise))
-        .offset(skip)
-        .limit(limit)
+        .order_by(FranchiseLocale.id)
     )
+    if after_id is not None:
+        query = query.where(FranchiseLocale.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
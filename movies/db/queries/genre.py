@@ -16,12 +16,15 @@ async def get_genre(session: AsyncSession, genre_id: int) -> Optional[Genre]:
     return result.scalar_one_or_none()
 
 
-async def get_genres(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Genre]:
-    result = await session.execute(
+async def get_genres(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Genre]:
+    query = (
         select(Genre)
-        .offset(skip)
-        .limit(limit)
+        .order_by(Genre.id)
     )
+    if after_id is not None:
+        query = query.where(Genre.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
     return list(result.scalars().all())
 
 
@@ -16,11 +16,25 @@ async def get_person(session: AsyncSession, person_id: int) -> Optional[Person]:
     return result.scalar_one_or_none()
 
 
-async def get_persons(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Person]:
-    result = await session.execute(
+async def get_persons(session: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Person]:
+    query = (
         select(Person)
-        .offset(skip)
-        .limit(limit)
+        .order_by(Person.id)
+    )
+    if after_id is not None:
+        query = query.where(Person.id > after_id)
+
+    result = await session.execute(query.offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+
+async def get_persons_by_ids(session: AsyncSession, person_ids: List[int]) -> List[Person]:
+    """Персоны по списку id одним запросом (без связей)"""
+    if not person_ids:
+        return []
+
+    result = await session.execute(
+        select(Person).where(Person.id.in_(set(person_ids)))
     )
     return list(result.scalars().all())
 
@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import HTTPException, status
+
+from config import settings
+
+
+class ElasticManager:
+    """Общий асинхронный клиент Elasticsearch и ограничитель параллельных поисков.
+
+    Создаётся в lifespan приложения, а не при импорте: клиент держит пул
+    aiohttp-соединений, привязанный к event loop.
+    """
+
+    def __init__(self) -> None:
+        self.client: AsyncElasticsearch | None = None
+        self.search_slots: asyncio.Semaphore | None = None
+
+    async def start(self) -> None:
+        self.client = create_es_client()
+        self.search_slots = asyncio.Semaphore(settings.ES_MAX_CONCURRENT_SEARCHES)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+
+def create_es_client() -> AsyncElasticsearch:
+    return AsyncElasticsearch(
+        settings.ELASTICSEARCH_URL,
+        connections_per_node=settings.ES_CONNECTIONS_PER_NODE,
+        request_timeout=settings.ES_REQUEST_TIMEOUT,
+        max_retries=settings.ES_MAX_RETRIES,
+        retry_on_timeout=True,
+    )
+
+
+es_manager = ElasticManager()
+
+
+async def get_es() -> AsyncElasticsearch:
+    if es_manager.client is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search is not available"
+        )
+    return es_manager.client
+
+
+@asynccontextmanager
+async def search_slot() -> AsyncIterator[None]:
+    """Не больше ES_MAX_CONCURRENT_SEARCHES поисков одновременно; остальные ждут или получают 503"""
+    try:
+        await asyncio.wait_for(es_manager.search_slots.acquire(), settings.ES_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search is overloaded, try again later"
+        )
+    try:
+        yield
+    finally:
+        es_manager.search_slots.release()
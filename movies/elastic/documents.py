@@ -0,0 +1,191 @@
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import queries
+from db.models import Person
+from schemas.entry import EntryResponse
+
+ENTRIES_INDEX = "entries"
+# персоны и франшизы ищутся сами по себе, а не только через документы entries
+PERSONS_INDEX = "persons"
+FRANCHISES_INDEX = "franchises"
+# автодополнение: названия entries и франшиз, имена персон
+SUGGEST_INDEX = "suggestions"
+SUGGEST_KINDS = ("entry", "franchise", "person")
+
+# загрузчик для пачки id: {id: документ, подсказка или изменившиеся поля}
+EntityLoader = Callable[[AsyncSession, List[int]], Awaitable[Dict[int, dict]]]
+
+
+def person_document(person: Person) -> dict:
+    return {
+        "id": person.id,
+        "name": person.name,
+        "en_name": person.en_name,
+        "birth_date": person.birth_date,
+    }
+
+
+def staff_fields(staff: Iterable[dict], persons: Dict[int, dict]) -> dict:
+    """Поля staff и staff_names_search документа entry"""
+    enriched_staff = []
+    staff_names_search = []
+
+    for member in staff:
+        person = persons.get(member["person_id"])
+        enriched_staff.append({**member, "person": person})
+
+        if person:
+            if person.get("name"):
+                staff_names_search.append(person["name"])
+            if person.get("en_name"):
+                staff_names_search.append(person["en_name"])
+
+    return {"staff": enriched_staff, "staff_names_search": " ".join(staff_names_search)}
+
+
+def franchise_document(franchise_id: int, locales: List[dict]) -> dict:
+    return {"id": franchise_id, "locales": locales}
+
+
+def build_entry_document(details: EntryResponse, persons: Dict[int, dict], franchises: Dict[int, dict]) -> dict:
+    """Документ индекса entries: EntryResponse + персоны в staff, строка для поиска по именам и франшиза"""
+    doc = details.model_dump()
+    doc.update(staff_fields(
+        (
+            {
+                "role": staff.role,
+                "character_name": staff.character_name,
+                "entry_id": staff.entry_id,
+                "person_id": staff.person_id,
+            }
+            for staff in details.staff
+        ),
+        persons,
+    ))
+    doc["franchise"] = franchises.get(details.franchise_id, franchise_document(details.franchise_id, []))
+    doc["year"] = details.premiere_world.year if details.premiere_world else None
+    return doc
+
+
+async def load_persons(db: AsyncSession, person_ids: List[int]) -> Dict[int, dict]:
+    return {
+        person.id: person_document(person)
+        for person in await queries.get_persons_by_ids(db, person_ids)
+    }
+
+
+async def load_franchises(db: AsyncSession, franchise_ids: List[int]) -> Dict[int, dict]:
+    franchises = {franchise_id: franchise_document(franchise_id, []) for franchise_id in set(franchise_ids)}
+    for locale in await queries.get_locales_by_franchise_ids(db, franchise_ids):
+        franchises[locale.franchise_id]["locales"].append({"language": locale.language, "title": locale.title})
+    return franchises
+
+
+async def build_entry_documents(db: AsyncSession, entries: List[EntryResponse]) -> List[dict]:
+    """Документы для пачки entries; персоны и франшизы всей пачки подгружаются двумя запросами"""
+    persons = await load_persons(db, [staff.person_id for details in entries for staff in details.staff])
+    franchises = await load_franchises(db, [details.franchise_id for details in entries])
+    return [build_entry_document(details, persons, franchises) for details in entries]
+
+
+# Частичные обновления: только поля, которые зависят от персон, жанров или франшиз.
+# Каждый загрузчик возвращает {entry_id: поля документа} для пачки entries.
+
+async def load_staff_fields(db: AsyncSession, entry_ids: List[int]) -> Dict[int, dict]:
+    staff_by_entry: Dict[int, List[dict]] = {entry_id: [] for entry_id in entry_ids}
+    staff_rows = await queries.get_staff_by_entry_ids(db, entry_ids)
+    for staff in staff_rows:
+        staff_by_entry[staff.entry_id].append({
+            "role": staff.role.value,
+            "character_name": staff.character_name,
+            "entry_id": staff.entry_id,
+            "person_id": staff.person_id,
+        })
+
+    persons = await load_persons(db, [staff.person_id for staff in staff_rows])
+    return {entry_id: staff_fields(staff, persons) for entry_id, staff in staff_by_entry.items()}
+
+
+async def load_genre_fields(db: AsyncSession, entry_ids: List[int]) -> Dict[int, dict]:
+    fields: Dict[int, dict] = {entry_id: {"genres": []} for entry_id in entry_ids}
+    for entry_id, genre in await queries.get_genres_by_entry_ids(db, entry_ids):
+        fields[entry_id]["genres"].append({"id": genre.id, "name": genre.name})
+    return fields
+
+
+async def load_franchise_fields(db: AsyncSession, entry_ids: List[int]) -> Dict[int, dict]:
+    franchise_ids = await queries.get_franchise_ids_by_entry_ids(db, entry_ids)
+    franchises = await load_franchises(db, list(franchise_ids.values()))
+    return {
+        entry_id: {"franchise": franchises[franchise_id]}
+        for entry_id, franchise_id in franchise_ids.items()
+    }
+
+
+async def load_franchise_documents(db: AsyncSession, franchise_ids: List[int]) -> Dict[int, dict]:
+    """Документы индекса franchises; франшиза без локалей (или удалённая) в индекс не попадает"""
+    franchises = await load_franchises(db, franchise_ids)
+    return {franchise_id: franchise for franchise_id, franchise in franchises.items() if franchise["locales"]}
+
+
+# сущность журнала related_changes -> (её собственный индекс, загрузчик документов)
+RELATED_DOCUMENTS: Dict[str, Tuple[str, EntityLoader]] = {
+    "person": (PERSONS_INDEX, load_persons),
+    "franchise": (FRANCHISES_INDEX, load_franchise_documents),
+}
+
+
+# Документы индекса suggestions: одна строка автодополнения на сущность,
+# _id вида "person:7", чтобы записи разных сущностей не пересекались.
+
+def suggestion_id(kind: str, object_id: int) -> str:
+    return f"{kind}:{object_id}"
+
+
+def suggestion_document(kind: str, object_id: int, inputs: Iterable[Optional[str]]) -> Optional[dict]:
+    """None, если подсказывать нечего: такой документ удаляется из индекса"""
+    inputs = list(dict.fromkeys(text for text in inputs if text))
+    if not inputs:
+        return None
+    return {"kind": kind, "id": object_id, "suggest": {"input": inputs}}
+
+
+def entry_suggestion(entry_id: int, titles: Iterable[Optional[str]]) -> Optional[dict]:
+    return suggestion_document("entry", entry_id, titles)
+
+
+async def load_person_suggestions(db: AsyncSession, person_ids: List[int]) -> Dict[int, dict]:
+    persons = await load_persons(db, person_ids)
+    return {
+        person_id: suggestion
+        for person_id, person in persons.items()
+        if (suggestion := suggestion_document("person", person_id, (person["name"], person["en_name"])))
+    }
+
+
+async def load_franchise_suggestions(db: AsyncSession, franchise_ids: List[int]) -> Dict[int, dict]:
+    franchises = await load_franchises(db, franchise_ids)
+    return {
+        franchise_id: suggestion
+        for franchise_id, franchise in franchises.items()
+        if (suggestion := suggestion_document("franchise", franchise_id, (locale["title"] for locale in franchise["locales"])))
+    }
+
+
+# сущность журнала related_changes -> загрузчик её подсказок
+RELATED_SUGGESTIONS: Dict[str, EntityLoader] = {
+    "person": load_person_suggestions,
+    "franchise": load_franchise_suggestions,
+}
+
+
+FanOut = Callable[[AsyncSession, List[int]], Awaitable[List[int]]]
+
+# сущность журнала related_changes -> (затронутые entries, загрузчик изменившихся полей)
+RELATED_FIELDS: Dict[str, Tuple[FanOut, EntityLoader]] = {
+    "person": (queries.get_entry_ids_by_person_ids, load_staff_fields),
+    "genre": (queries.get_entry_ids_by_genre_ids, load_genre_fields),
+    "franchise": (queries.get_entry_ids_by_franchise_ids, load_franchise_fields),
+}
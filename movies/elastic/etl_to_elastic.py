@@ -1,66 +1,323 @@
+import argparse
 import asyncio
-from session import get_session
-from routes.utils.entry import load_entry_details
-from sqlalchemy import text
-from elasticsearch import Elasticsearch
-import os
-
-ELASTICSEARCH_URL = os.environ.get("ELASTICSEARCH_URL", "http://elasticsearch:9200")
-
-es = Elasticsearch(ELASTICSEARCH_URL)
-
-async def get_person_by_id(db, person_id):
-    result = await db.execute(
-        text("SELECT id, name, en_name, birth_date FROM persons WHERE id = :id"),
-        {"id": person_id}
-    )
-    row = result.fetchone()
-    if not row:
-        return None
-    return {
-        "id": row[0],
-        "name": row[1],
-        "en_name": row[2],
-        "birth_date": row[3]
-    }
-
-async def main():
-    async for db in get_session():
-        result = await db.execute(text("SELECT id FROM entries"))
-        ids = [r[0] for r in result.fetchall()]
-
-        for entry_id in ids:
-            details = await load_entry_details(db, entry_id)
-            if not details:
+import time
+from typing import List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from prometheus_client import start_http_server
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import queries
+from elastic.client import create_es_client
+from elastic.documents import (
+    ENTRIES_INDEX, FRANCHISES_INDEX, PERSONS_INDEX, SUGGEST_INDEX, build_entry_documents, entry_suggestion,
+    franchise_document, person_document, suggestion_document, suggestion_id,
+)
+from elastic.indices import abort_build, create_build_index, finish_build, refresh_search_indices
+from elastic.metrics import BATCH_DOCUMENTS, REINDEX_DOCUMENTS, REINDEX_RATE, STAGE_DURATION
+from logger import logger, setup_logging
+from routes.utils.entry import build_entry_response
+from session import SessionManager
+
+BATCH_SIZE = 500
+PARALLELISM = 4
+MAX_RETRIES = 5
+# bulk-запрос на сотни документов заметно дольше обычного поиска
+BULK_REQUEST_TIMEOUT = 60
+# позиция в sync_watermarks: новое поколение кеша поиска в API после переключения alias
+REINDEX_MARK_NAME = f"{ENTRIES_INDEX}_reindex"
+# порт 8001 в контейнере etl_worker занят sync_worker
+METRICS_PORT = 8003
+
+
+class ReindexStats:
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.indexed = 0
+        self.skipped = 0
+        self.failed = 0
+        # id всех прочитанных entries: после загрузки по ним ищутся удалённые за время сборки
+        self.read_ids: List[int] = []
+
+    @property
+    def docs_per_sec(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.indexed / elapsed if elapsed > 0 else 0.0
+
+    def add(self, indexed: int, skipped: int, failed: int) -> None:
+        self.indexed += indexed
+        self.skipped += skipped
+        self.failed += failed
+        REINDEX_DOCUMENTS.labels(result="indexed").inc(indexed)
+        REINDEX_DOCUMENTS.labels(result="skipped").inc(skipped)
+        REINDEX_DOCUMENTS.labels(result="failed").inc(failed)
+        REINDEX_RATE.set(self.docs_per_sec)
+
+    def report(self) -> None:
+        logger.info(
+            f"Indexed {self.indexed} docs, skipped {self.skipped}, failed {self.failed} "
+            f"({self.docs_per_sec:.1f} docs/sec)"
+        )
+
+
+async def read_batches(queue: asyncio.Queue, stats: ReindexStats, batch_size: int, consumers: int) -> None:
+    """Постранично (keyset по id) читает entries и кладёт в очередь готовые пачки документов.
+
+    Каждая пачка — три SQL-запроса: entries со всеми связями, персоны из их staff
+    и локали их франшиз.
+    """
+    session_maker = SessionManager().get_session_maker()
+    after_id = None
+
+    async with session_maker() as db:
+        while True:
+            with STAGE_DURATION.labels(pipeline="reindex", stage="load_entries").time():
+                rows = await queries.get_entries_details(db, limit=batch_size, after_id=after_id)
+            if not rows:
+                break
+            after_id = rows[-1].Entry.id
+            stats.read_ids += [row.Entry.id for row in rows]
+
+            with STAGE_DURATION.labels(pipeline="reindex", stage="build_documents").time():
+                documents = await build_entry_documents(db, [build_entry_response(row) for row in rows])
+            # не копим весь каталог в identity map сессии
+            db.expunge_all()
+            await queue.put(documents)
+
+    for _ in range(consumers):
+        await queue.put(None)
+
+
+async def ship_batches(es: AsyncElasticsearch, queue: asyncio.Queue, stats: ReindexStats,
+                       index: str, max_retries: int, op_type: str) -> None:
+    """Отправляет пачки через bulk API; отклонённые (429) документы helper повторяет с backoff"""
+    while True:
+        documents = await queue.get()
+        if documents is None:
+            return
+
+        actions = (
+            {"_op_type": op_type, "_index": index, "_id": doc["id"], "_source": doc}
+            for doc in documents
+        )
+        BATCH_DOCUMENTS.labels(pipeline="reindex").observe(len(documents))
+        with STAGE_DURATION.labels(pipeline="reindex", stage="bulk_request").time():
+            indexed, errors = await async_bulk(
+                es,
+                actions,
+                chunk_size=len(documents),
+                max_retries=max_retries,
+                initial_backoff=1,
+                max_backoff=30,
+                raise_on_error=False,
+            )
+
+        # 409 при create: документ уже записал sync_worker, и он не старее нашего
+        conflicts = [error for error in errors if error.get(op_type, {}).get("status") == 409]
+        errors = [error for error in errors if error not in conflicts]
+
+        stats.add(indexed, len(conflicts), len(errors))
+        for error in errors[:5]:
+            logger.error(f"Failed to index document: {error}")
+        stats.report()
+
+
+async def load_index(es: AsyncElasticsearch, index: str, batch_size: int = BATCH_SIZE,
+                     parallelism: int = PARALLELISM, max_retries: int = MAX_RETRIES,
+                     op_type: str = "index") -> ReindexStats:
+    """Загрузка всех entries: одна задача читает БД, parallelism задач параллельно шлют bulk-запросы"""
+    # ограниченная очередь: чтение БД не убегает дальше, чем успевает Elasticsearch
+    queue: asyncio.Queue = asyncio.Queue(maxsize=parallelism * 2)
+    stats = ReindexStats()
+
+    async with asyncio.TaskGroup() as tasks:
+        tasks.create_task(read_batches(queue, stats, batch_size, parallelism))
+        for _ in range(parallelism):
+            tasks.create_task(ship_batches(es, queue, stats, index, max_retries, op_type))
+
+    return stats
+
+
+async def remove_deleted_entries(es: AsyncElasticsearch, index: str, entry_ids: List[int],
+                                 batch_size: int = BATCH_SIZE) -> int:
+    """Удалить из строящегося индекса entries, удалённые из базы, пока шла загрузка.
+
+    Удаление от sync_worker получает 404, если документа в строящемся индексе
+    ещё нет, а create переиндексации потом записывает прочитанную раньше копию.
+    После загрузки документ уже есть, и новые удаления воркера проходят сами.
+    """
+    session_maker = SessionManager().get_session_maker()
+    removed = 0
+
+    async with session_maker() as db:
+        for i in range(0, len(entry_ids), batch_size):
+            chunk = entry_ids[i:i + batch_size]
+            deleted = set(chunk) - set(await queries.get_existing_entry_ids(db, chunk))
+            if not deleted:
                 continue
 
-            enriched_staff = []
-            staff_names_search = []
+            actions = [{"_op_type": "delete", "_index": index, "_id": entry_id} for entry_id in sorted(deleted)]
+            _, errors = await async_bulk(es, actions, raise_on_error=False)
+            errors = [error for error in errors if error.get("delete", {}).get("status") != 404]
+            if errors:
+                raise RuntimeError(f"Failed to remove deleted entries from {index}: {errors[:5]}")
+            removed += len(deleted)
+
+    return removed
+
+
+# страница сущностей: (id по порядку, bulk-действия для их документов и подсказок)
+EntityPage = Tuple[List[int], List[dict]]
+
+
+def suggestion_action(kind: str, object_id: int, suggestion: Optional[dict]) -> List[dict]:
+    if not suggestion:
+        return []
+    return [{"_index": SUGGEST_INDEX, "_id": suggestion_id(kind, object_id), "_source": suggestion}]
+
+
+async def entry_page(db: AsyncSession, limit: int, after_id: Optional[int]) -> EntityPage:
+    cards = await queries.get_entry_cards(db, limit=limit, after_id=after_id)
+    actions = [
+        action
+        for card in cards
+        for action in suggestion_action("entry", card.entry_id, entry_suggestion(card.entry_id, card.titles.values()))
+    ]
+    return [card.entry_id for card in cards], actions
+
+
+async def franchise_page(db: AsyncSession, limit: int, after_id: Optional[int]) -> EntityPage:
+    franchises = await queries.get_franchises(db, limit=limit, after_id=after_id)
+    actions = []
+    for franchise in franchises:
+        locales = [{"language": locale.language, "title": locale.title} for locale in franchise.locales]
+        if locales:
+            actions.append({
+                "_index": FRANCHISES_INDEX, "_id": franchise.id, "_source": franchise_document(franchise.id, locales),
+            })
+        actions += suggestion_action(
+            "franchise", franchise.id, suggestion_document("franchise", franchise.id, (locale["title"] for locale in locales))
+        )
+    return [franchise.id for franchise in franchises], actions
+
+
+async def person_page(db: AsyncSession, limit: int, after_id: Optional[int]) -> EntityPage:
+    persons = await queries.get_persons(db, limit=limit, after_id=after_id)
+    actions = []
+    for person in persons:
+        actions.append({"_index": PERSONS_INDEX, "_id": person.id, "_source": person_document(person)})
+        actions += suggestion_action(
+            "person", person.id, suggestion_document("person", person.id, (person.name, person.en_name))
+        )
+    return [person.id for person in persons], actions
+
+
+ENTITY_PAGES = (
+    ("entry", entry_page),
+    ("franchise", franchise_page),
+    ("person", person_page),
+)
+
+
+async def load_entity_indices(es: AsyncElasticsearch, batch_size: int = BATCH_SIZE,
+                              max_retries: int = MAX_RETRIES) -> int:
+    """Индексы persons и franchises и подсказки всех entries, франшиз и персон.
+
+    Эти индексы небольшие и пишутся на месте, без версий и alias:
+    документ, который sync_worker успеет обновить раньше, в худшем случае
+    откатится до прочитанного здесь и поправится следующим изменением сущности.
+    """
+    session_maker = SessionManager().get_session_maker()
+    written = 0
+
+    async with session_maker() as db:
+        for kind, read_page in ENTITY_PAGES:
+            after_id = None
+            while True:
+                ids, actions = await read_page(db, batch_size, after_id)
+                if not ids:
+                    break
+                after_id = ids[-1]
+                db.expunge_all()
+
+                indexed, errors = await async_bulk(
+                    es, actions, max_retries=max_retries, initial_backoff=1, max_backoff=30, raise_on_error=False
+                )
+                written += indexed
+                for error in errors[:5]:
+                    logger.error(f"Failed to index {kind}: {error}")
+
+    logger.info(f"Indexed {written} person, franchise and suggestion documents")
+    return written
+
+
+async def reindex(batch_size: int = BATCH_SIZE, parallelism: int = PARALLELISM,
+                  max_retries: int = MAX_RETRIES, keep_old: bool = False) -> ReindexStats:
+    """Переиндексация без простоя.
+
+    Новый entries_vN строится рядом с рабочим индексом без refresh и реплик;
+    sync_worker в это время пишет изменения в оба индекса. Документы загружаются
+    через create, чтобы не затереть более свежие записи воркера, а entries, удалённые
+    за время загрузки, затем убираются из нового индекса. После этого настройки
+    возвращаются, и alias entries атомарно переключается на новый индекс.
+    """
+    client = create_es_client()
+    es = client.options(request_timeout=BULK_REQUEST_TIMEOUT)
+
+    try:
+        index = await create_build_index(es)
+        logger.info(f"Building {index}")
+        try:
+            stats = await load_index(es, index, batch_size, parallelism, max_retries, op_type="create")
+            if stats.failed:
+                raise RuntimeError(f"{stats.failed} documents failed, alias is left unchanged")
+            removed = await remove_deleted_entries(es, index, stats.read_ids, batch_size)
+            logger.info(f"Removed {removed} entries deleted during the build")
+        except BaseException:
+            await abort_build(es, index)
+            raise
+
+        previous = await finish_build(es, index)
+        logger.info(f"Alias {ENTRIES_INDEX} now points to {index}")
+        if previous and not keep_old:
+            await es.indices.delete(index=",".join(previous))
+            logger.info(f"Deleted previous indices: {previous}")
+
+        await load_entity_indices(es, batch_size, max_retries)
+
+        await refresh_search_indices(es)
+        session_maker = SessionManager().get_session_maker()
+        async with session_maker() as db:
+            await queries.mark_reindexed(db, REINDEX_MARK_NAME)
+    finally:
+        await client.close()
+        await SessionManager().engine.dispose()
 
-            for staff in details.staff:
-                person = await get_person_by_id(db, staff.person_id)
-                staff_dict = {
-                    "role": staff.role,
-                    "character_name": staff.character_name,
-                    "entry_id": staff.entry_id,
-                    "person_id": staff.person_id,
-                    "person": person,
-                }
+    return stats
 
-                enriched_staff.append(staff_dict)
 
-                if person:
-                    if person.get("name"):
-                        staff_names_search.append(person["name"])
-                    if person.get("en_name"):
-                        staff_names_search.append(person["en_name"])
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Zero-downtime full reindex of entries into Elasticsearch")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="documents per DB page and bulk request")
+    parser.add_argument("--parallelism", type=int, default=PARALLELISM, help="concurrent bulk requests")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help="retries for rejected (429) documents")
+    parser.add_argument("--keep-old", action="store_true", help="keep the previous index after the alias swap")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="port for Prometheus metrics while the reindex runs, 0 to disable")
+    return parser.parse_args()
 
-            doc = details.model_dump() if hasattr(details, 'model_dump') else details.dict()
-            doc["staff"] = enriched_staff
-            doc["staff_names_search"] = " ".join(staff_names_search)
 
-            es.index(index="entries", id=entry_id, body=doc)
+async def main() -> None:
+    args = parse_args()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+        logger.info(f"Prometheus metrics server started on port {args.metrics_port}")
+    stats = await reindex(args.batch_size, args.parallelism, args.max_retries, args.keep_old)
+    logger.info("Reindex finished")
+    stats.report()
 
-            print(f"Indexed: id={details.id}, title={details.title}")
 
-asyncio.run(main())
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main())
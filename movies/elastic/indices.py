@@ -0,0 +1,96 @@
+import re
+from typing import List, Optional
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+from config import settings
+from elastic.documents import ENTRIES_INDEX, FRANCHISES_INDEX, PERSONS_INDEX, SUGGEST_INDEX
+from elastic.mappings import INDEX_TEMPLATES
+
+# пока идёт полная переиндексация, этот alias указывает на строящийся индекс:
+# sync_worker пишет изменения и туда, и в рабочий индекс
+ENTRIES_BUILD_ALIAS = f"{ENTRIES_INDEX}_next"
+
+# индексы, которые читает API; через alias entries обновляется только рабочий индекс, не строящийся
+SEARCH_INDICES = (ENTRIES_INDEX, SUGGEST_INDEX, PERSONS_INDEX, FRANCHISES_INDEX)
+
+# на время загрузки: без refresh и реплик bulk-запись заметно быстрее
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+
+def serving_settings() -> dict:
+    return {"refresh_interval": "1s", "number_of_replicas": settings.ES_NUMBER_OF_REPLICAS}
+
+
+async def next_versioned_name(es: AsyncElasticsearch, alias: str = ENTRIES_INDEX) -> str:
+    existing = await es.indices.get(index=f"{alias}_v*", expand_wildcards="all")
+    versions = [
+        int(match.group(1))
+        for name in existing
+        if (match := re.fullmatch(rf"{re.escape(alias)}_v(\d+)", name))
+    ]
+    return f"{alias}_v{max(versions, default=0) + 1}"
+
+
+async def indices_behind(es: AsyncElasticsearch, alias: str) -> List[str]:
+    try:
+        return list(await es.indices.get_alias(name=alias))
+    except NotFoundError:
+        return []
+
+
+async def write_targets(es: AsyncElasticsearch) -> List[str]:
+    """Куда sync_worker пишет изменения: рабочий alias и строящийся индекс, если он есть"""
+    return [ENTRIES_INDEX] + await indices_behind(es, ENTRIES_BUILD_ALIAS)
+
+
+async def refresh_search_indices(es: AsyncElasticsearch) -> None:
+    """Сделать записанное переиндексацией видимым поиску до того, как API сбросит кеш результатов"""
+    await es.indices.refresh(index=",".join(SEARCH_INDICES), ignore_unavailable=True, allow_no_indices=True)
+
+
+async def ensure_index_templates(es: AsyncElasticsearch) -> None:
+    """Записать шаблоны индексов: маппинг берётся из кода, а не выводится из документов"""
+    for name, template in INDEX_TEMPLATES.items():
+        await es.indices.put_index_template(name=name, **template())
+
+
+async def create_build_index(es: AsyncElasticsearch, alias: str = ENTRIES_INDEX) -> str:
+    """Создать entries_vN под загрузку и повесить на него ENTRIES_BUILD_ALIAS"""
+    await ensure_index_templates(es)
+    name = await next_versioned_name(es, alias)
+    await es.indices.create(
+        index=name,
+        settings=BULK_LOAD_SETTINGS,
+        aliases={ENTRIES_BUILD_ALIAS: {}},
+    )
+    return name
+
+
+async def finish_build(es: AsyncElasticsearch, name: str, alias: str = ENTRIES_INDEX) -> List[str]:
+    """Вернуть обычные настройки и атомарно переключить alias на новый индекс.
+
+    Возвращает индексы, с которых alias снят (их можно удалить).
+    """
+    await es.indices.put_settings(index=name, settings=serving_settings())
+    await es.indices.refresh(index=name)
+
+    previous = await indices_behind(es, alias)
+    actions = [{"remove": {"index": index, "alias": alias}} for index in previous]
+    # до первой переиндексации entries — обычный индекс, а не alias
+    legacy_index: Optional[str] = None
+    if not previous and await es.indices.exists(index=alias):
+        legacy_index = alias
+        actions.append({"remove_index": {"index": alias}})
+    actions += [
+        {"remove": {"index": name, "alias": ENTRIES_BUILD_ALIAS}},
+        {"add": {"index": name, "alias": alias}},
+    ]
+    await es.indices.update_aliases(actions=actions)
+
+    return previous if legacy_index is None else []
+
+
+async def abort_build(es: AsyncElasticsearch, name: str) -> None:
+    """Снять ENTRIES_BUILD_ALIAS и удалить недостроенный индекс"""
+    await es.indices.delete(index=name, ignore_unavailable=True)
@@ -0,0 +1,214 @@
+from elastic.documents import ENTRIES_INDEX, FRANCHISES_INDEX, PERSONS_INDEX, SUGGEST_INDEX
+
+ENTRIES_TEMPLATE = ENTRIES_INDEX
+SUGGEST_TEMPLATE = SUGGEST_INDEX
+PERSONS_TEMPLATE = PERSONS_INDEX
+FRANCHISES_TEMPLATE = FRANCHISES_INDEX
+
+ANALYSIS = {
+    "filter": {
+        "prefix_ngram": {"type": "edge_ngram", "min_gram": 2, "max_gram": 20},
+    },
+    "analyzer": {
+        # при индексации слово раскладывается на префиксы: поиск по началу слова —
+        # обычный term-запрос вместо разворачивания prefix по словарю
+        "prefix": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["lowercase", "prefix_ngram"],
+        },
+    },
+}
+
+
+def title_field() -> dict:
+    """Название: стандартный анализ, морфология ru/en и префиксы для поиска по мере ввода"""
+    return {
+        "type": "text",
+        "fields": {
+            "ru": {"type": "text", "analyzer": "russian"},
+            "en": {"type": "text", "analyzer": "english"},
+            "prefix": {"type": "text", "analyzer": "prefix", "search_analyzer": "standard"},
+            "raw": {"type": "keyword", "ignore_above": 256},
+        },
+    }
+
+
+def description_field() -> dict:
+    return {
+        "type": "text",
+        "fields": {
+            "ru": {"type": "text", "analyzer": "russian"},
+            "en": {"type": "text", "analyzer": "english"},
+        },
+    }
+
+
+def name_field() -> dict:
+    return {
+        "type": "text",
+        "fields": {
+            "prefix": {"type": "text", "analyzer": "prefix", "search_analyzer": "standard"},
+        },
+    }
+
+
+# поля, по которым не ищут и не фильтруют: только хранятся в _source
+NOT_INDEXED_DATE = {"type": "date", "index": False, "doc_values": False}
+NOT_INDEXED_INTEGER = {"type": "integer", "index": False, "doc_values": False}
+
+ENTRIES_MAPPINGS = {
+    # новые поля документа попадают в _source, но не индексируются, пока их не добавят сюда
+    "dynamic": False,
+    "properties": {
+        "id": {"type": "integer"},
+        "franchise_id": {"type": "integer"},
+        "entry_number": {"type": "integer"},
+        "type": {"type": "keyword"},
+        "status": {"type": "keyword"},
+        "rating_mpaa": {"type": "keyword"},
+        "age_rating": {"type": "integer"},
+        "duration": {"type": "integer"},
+        "premiere_world": {"type": "date"},
+        "year": {"type": "short"},
+        "premiere_digital": NOT_INDEXED_DATE,
+        "created_at": NOT_INDEXED_DATE,
+        "updated_at": NOT_INDEXED_DATE,
+        "locales": {
+            "properties": {
+                "id": NOT_INDEXED_INTEGER,
+                "entry_id": NOT_INDEXED_INTEGER,
+                "language": {"type": "keyword"},
+                "title": title_field(),
+                "description": description_field(),
+            },
+        },
+        # nested: фасет по жанрам сопоставляет id с названием того же жанра
+        "genres": {
+            "type": "nested",
+            "properties": {
+                "id": {"type": "integer"},
+                "name": {"type": "keyword"},
+            },
+        },
+        "staff": {
+            "properties": {
+                "entry_id": NOT_INDEXED_INTEGER,
+                "person_id": {"type": "integer"},
+                "role": {"type": "keyword"},
+                "character_name": {"type": "text"},
+                "person": {
+                    "properties": {
+                        "id": NOT_INDEXED_INTEGER,
+                        "name": {"type": "text"},
+                        "en_name": {"type": "text"},
+                        "birth_date": NOT_INDEXED_DATE,
+                    },
+                },
+            },
+        },
+        "staff_names_search": name_field(),
+        "franchise": {
+            "properties": {
+                "id": {"type": "integer"},
+                "locales": {
+                    "properties": {
+                        "language": {"type": "keyword"},
+                        "title": title_field(),
+                    },
+                },
+            },
+        },
+        "episodes": {"type": "object", "enabled": False},
+    },
+}
+
+
+PERSONS_MAPPINGS = {
+    "dynamic": False,
+    "properties": {
+        "id": {"type": "integer"},
+        "name": name_field(),
+        "en_name": name_field(),
+        "birth_date": NOT_INDEXED_DATE,
+    },
+}
+
+
+FRANCHISES_MAPPINGS = {
+    "dynamic": False,
+    "properties": {
+        "id": {"type": "integer"},
+        "locales": {
+            "properties": {
+                "language": {"type": "keyword"},
+                "title": title_field(),
+            },
+        },
+    },
+}
+
+
+SUGGEST_MAPPINGS = {
+    "dynamic": False,
+    "properties": {
+        "kind": {"type": "keyword"},
+        "id": {"type": "integer"},
+        # completion держит подсказки в FST в памяти: поиск по префиксу без обхода индекса
+        "suggest": {
+            "type": "completion",
+            "contexts": [{"name": "kind", "type": "category", "path": "kind"}],
+        },
+    },
+}
+
+
+def entries_template() -> dict:
+    """Шаблон для entries_vN (и для entries, если его создаст запись sync_worker до первой переиндексации)"""
+    return {
+        "index_patterns": [ENTRIES_INDEX, f"{ENTRIES_INDEX}_v*"],
+        "template": {
+            "settings": {"analysis": ANALYSIS},
+            "mappings": ENTRIES_MAPPINGS,
+        },
+        "priority": 100,
+    }
+
+
+def suggest_template() -> dict:
+    return {
+        "index_patterns": [SUGGEST_INDEX],
+        "template": {"mappings": SUGGEST_MAPPINGS},
+        "priority": 100,
+    }
+
+
+def persons_template() -> dict:
+    return {
+        "index_patterns": [PERSONS_INDEX],
+        "template": {
+            "settings": {"analysis": ANALYSIS},
+            "mappings": PERSONS_MAPPINGS,
+        },
+        "priority": 100,
+    }
+
+
+def franchises_template() -> dict:
+    return {
+        "index_patterns": [FRANCHISES_INDEX],
+        "template": {
+            "settings": {"analysis": ANALYSIS},
+            "mappings": FRANCHISES_MAPPINGS,
+        },
+        "priority": 100,
+    }
+
+
+# имя шаблона -> тело; записываются при старте sync_worker и перед переиндексацией
+INDEX_TEMPLATES = {
+    ENTRIES_TEMPLATE: entries_template,
+    SUGGEST_TEMPLATE: suggest_template,
+    PERSONS_TEMPLATE: persons_template,
+    FRANCHISES_TEMPLATE: franchises_template,
+}
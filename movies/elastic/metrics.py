@@ -0,0 +1,43 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# sync_worker
+EVENTS_PROCESSED = Counter('etl_events_processed_total', 'Total number of events processed by ETL worker')
+SYNC_ERRORS = Counter('etl_sync_errors_total', 'Total number of errors during sync')
+EVENTS_RECEIVED = Counter('etl_events_received_total', 'Raw entry changes read from the entry_changes log')
+EVENTS_COALESCED = Counter('etl_events_coalesced_total', 'Changes merged into an entry already present in the same batch')
+WINDOW_SIZE = Histogram(
+    'etl_window_entries',
+    'Unique entries synced per changelog batch',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+QUEUE_DEPTH = Gauge('etl_queue_batches', 'Batches waiting for a sync consumer')
+RELATED_FANOUT = Counter(
+    'etl_related_entries_total',
+    'Entries partially updated after a person, genre or franchise change',
+    ['entity']
+)
+# от записи изменения в журнал (в транзакции, которая его сделала) до ответа ES на bulk
+REPLICATION_LAG = Histogram(
+    'etl_replication_lag_seconds',
+    'Time from a change being logged in Postgres to its Elasticsearch acknowledgement',
+    ['log'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+
+# sync_worker и переиндексация
+STAGE_DURATION = Histogram(
+    'etl_stage_duration_seconds',
+    'Time spent in each stage of writing a batch to Elasticsearch',
+    ['pipeline', 'stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+BATCH_DOCUMENTS = Histogram(
+    'etl_batch_documents',
+    'Documents per bulk request',
+    ['pipeline'],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+
+# переиндексация
+REINDEX_DOCUMENTS = Counter('etl_reindex_documents_total', 'Documents handled by the full reindex', ['result'])
+REINDEX_RATE = Gauge('etl_reindex_docs_per_second', 'Average indexing rate of the running full reindex')
@@ -1,16 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from uvicorn import run
 from routes import list_of_routes
+from routes.utils.pagination import NEXT_CURSOR_HEADER
 from prometheus_fastapi_instrumentator import Instrumentator
 from logger import logger, setup_logging
 from tracing import setup_tracing
 from starlette.requests import Request
 import time
 
+from cache import listen_for_invalidations, search_cache
+from elastic.client import es_manager
+from config import settings
+
 setup_logging()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await es_manager.start()
+    await search_cache.start()
+    cache_listener = asyncio.create_task(listen_for_invalidations(settings.POSTGRES_DSN))
+    yield
+    cache_listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await cache_listener
+    await search_cache.close()
+    await es_manager.close()
+
+
+app = FastAPI(lifespan=lifespan)
 setup_tracing(app, "cinema_api")
 
 @app.middleware("http")
@@ -29,6 +51,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 for route in list_of_routes:
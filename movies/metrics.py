@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 # User activity metrics
 USER_SEARCH_TOTAL = Counter(
@@ -30,3 +30,49 @@ PERSON_VIEW_TOTAL = Counter(
     "Total number of times a person was viewed",
     ["person_id"]
 )
+
+# Response cache metrics
+RESPONSE_CACHE_HITS_TOTAL = Counter(
+    "response_cache_hits_total",
+    "Total number of responses served from the in-process cache",
+    ["cache"]
+)
+
+RESPONSE_CACHE_MISSES_TOTAL = Counter(
+    "response_cache_misses_total",
+    "Total number of response cache misses",
+    ["cache"]
+)
+
+RESPONSE_CACHE_EVICTIONS_TOTAL = Counter(
+    "response_cache_evictions_total",
+    "Total number of response cache evictions",
+    ["cache", "reason"]
+)
+
+SEARCH_CACHE_REDIS_ERRORS_TOTAL = Counter(
+    "search_cache_redis_errors_total",
+    "Redis errors in the shared search cache (the request falls back to Elasticsearch)"
+)
+
+# Database connection pool metrics
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of persistent connections in the SQLAlchemy pool"
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Number of connections currently checked out from the pool"
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Number of overflow connections currently open above the pool size"
+)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
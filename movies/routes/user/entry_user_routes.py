@@ -1,12 +1,21 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from cache import entry_cache
 from session import get_session
 from db import queries
+from db.models import ContentStatus, EntryType
 from schemas.entry import EntryResponse
-from routes.utils.entry import load_entry_details
+from schemas.entry_card import EntryCardResponse
+from routes.utils.entry import (
+    EntryView, build_entry_response, dump_entry, entries_response, entry_view, load_entry_details,
+)
+from routes.utils.pagination import decode_cursor, set_next_cursor
+from routes.utils.conditional import (
+    CachedResponse, conditional_response, is_not_modified, make_etag, not_modified_response,
+)
 
 from metrics import MOVIE_VIEW_DETAILS_TOTAL
 
@@ -21,33 +30,85 @@ router = APIRouter(prefix="/entries", tags=["User"])
 async def get_entries(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    view: EntryView = Depends(entry_view),
     db: AsyncSession = Depends(get_session)
 ):
-    db_entries = await queries.get_entries(db, skip=skip, limit=limit)
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        skip = 0
+
+    rows = await queries.get_entries_details(
+        db, skip=skip, limit=limit, after_id=after_id,
+        relations=view.relations, languages=view.languages
+    )
+    response = entries_response([build_entry_response(row) for row in rows], view)
+    set_next_cursor(response, [row.Entry.id for row in rows], limit)
+    return response
 
-    entries_response = []
-    for db_entry in db_entries:
-        entry_detail = await load_entry_details(db, db_entry.id)
-        if entry_detail:
-            entries_response.append(entry_detail)
+@router.get(
+    "/cards/",
+    response_model=List[EntryCardResponse],
+    summary="Get compact entry cards for catalog pages"
+)
+async def get_entry_cards(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    entry_type: Optional[EntryType] = Query(None, alias="type"),
+    entry_status: Optional[ContentStatus] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_session)
+):
+    """Карточки читаются из entry_cards одним запросом по первичному ключу, без джойнов"""
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        skip = 0
 
-    return entries_response
+    cards = await queries.get_entry_cards(
+        db, skip=skip, limit=limit, after_id=after_id, entry_type=entry_type, status=entry_status
+    )
+    set_next_cursor(response, [card.entry_id for card in cards], limit)
+    return cards
 
 @router.get(
     "/{entry_id}/",
     response_model=EntryResponse,
     summary="Get a specific entry by ID",
-    responses={404: {"description": "Entry not found"}}
+    responses={
+        304: {"description": "Entry not modified since the given ETag"},
+        404: {"description": "Entry not found"},
+    }
 )
 async def get_entry(
     entry_id: int,
+    request: Request,
+    view: EntryView = Depends(entry_view),
     db: AsyncSession = Depends(get_session)
 ):
     MOVIE_VIEW_DETAILS_TOTAL.labels(movie_id=str(entry_id)).inc()
-    entry = await load_entry_details(db, entry_id)
-    if not entry:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Entry not found"
-        )
-    return entry
+    cache_key = (entry_id, view)
+    cached = entry_cache.get(cache_key)
+    if cached is None:
+        token = entry_cache.fill_token()
+        version = await queries.get_entry_version(db, entry_id)
+        if not version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Entry not found"
+            )
+
+        etag = make_etag(view.etag_fingerprint(version.fingerprint))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        entry = await load_entry_details(db, entry_id, view)
+        if not entry:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Entry not found"
+            )
+        cached = CachedResponse(dump_entry(entry, view), etag)
+        entry_cache.set(cache_key, cached, token, depends_on=[entry_id])
+
+    return conditional_response(request, cached)
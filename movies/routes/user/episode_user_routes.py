@@ -1,6 +1,6 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from session import get_session
@@ -8,6 +8,7 @@ from db import queries
 from schemas.episode import EpisodeResponse
 from schemas.episode_locale import EpisodeLocaleResponse
 from routes.utils.episode import load_episode_with_locales
+from routes.utils.pagination import decode_cursor, set_next_cursor
 
 from metrics import EPISODE_VIEW_TOTAL
 
@@ -20,11 +21,17 @@ router = APIRouter(prefix="/episodes", tags=["User"])
     summary="Get all episodes"
 )
 async def get_episodes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session)
 ):
-    db_episodes = await queries.get_episodes(db, skip=skip, limit=limit)
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        skip = 0
+
+    db_episodes = await queries.get_episodes(db, skip=skip, limit=limit, after_id=after_id)
 
     episodes_response = []
     for db_episode in db_episodes:
@@ -33,6 +40,7 @@ async def get_episodes(
         episode_schema.locales = [EpisodeLocaleResponse.model_validate(loc) for loc in locales]
         episodes_response.append(episode_schema)
 
+    set_next_cursor(response, [db_episode.id for db_episode in db_episodes], limit)
     return episodes_response
 
 
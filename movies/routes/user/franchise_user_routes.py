@@ -1,12 +1,17 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from cache import franchise_cache
 from session import get_session
 from db import queries
 from schemas.franchise import FranchiseResponse, FranchiseBriefResponse
-from routes.utils.franchise import load_franchise_with_locales, load_franchise_full
+from routes.utils.franchise import build_franchise_brief, load_franchise_full
+from routes.utils.pagination import decode_cursor, set_next_cursor
+from routes.utils.conditional import (
+    CachedResponse, conditional_response, is_not_modified, make_etag, not_modified_response,
+)
 
 router = APIRouter(prefix="/franchises", tags=["User"])
 
@@ -17,33 +22,57 @@ router = APIRouter(prefix="/franchises", tags=["User"])
     summary="Get all franchises"
 )
 async def get_franchises(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session)
 ):
-    db_franchises = await queries.get_franchises(db, skip=skip, limit=limit)
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        skip = 0
 
-    franchises_with_locales = []
-    for db_franchise in db_franchises:
-        franchise_schema = await load_franchise_with_locales(db, db_franchise)
-        franchises_with_locales.append(franchise_schema)
+    db_franchises = await queries.get_franchises(db, skip=skip, limit=limit, after_id=after_id)
 
-    return franchises_with_locales
+    set_next_cursor(response, [db_franchise.id for db_franchise in db_franchises], limit)
+    return [build_franchise_brief(db_franchise) for db_franchise in db_franchises]
 
 
 @router.get(
     "/{franchise_id}/",
     response_model=FranchiseResponse,
-    summary="Get a specific franchise by ID"
+    summary="Get a specific franchise by ID",
+    responses={304: {"description": "Franchise not modified since the given ETag"}}
 )
 async def get_franchise(
     franchise_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_session)
 ):
-    franchise = await load_franchise_full(db, franchise_id)
-    if not franchise:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Franchise not found"
+    cached = franchise_cache.get(franchise_id)
+    if cached is None:
+        token = franchise_cache.fill_token()
+        version = await queries.get_franchise_version(db, franchise_id)
+        if not version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Franchise not found"
+            )
+
+        etag = make_etag(version.fingerprint)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        franchise = await load_franchise_full(db, franchise_id)
+        if not franchise:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Franchise not found"
+            )
+        cached = CachedResponse(franchise.model_dump_json().encode(), etag)
+        franchise_cache.set(
+            franchise_id, cached, token,
+            depends_on=[entry.id for entry in franchise.entries]
         )
-    return franchise
+
+    return conditional_response(request, cached)
@@ -1,11 +1,12 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from session import get_session
 from db import queries
 from schemas.genre import GenreResponse
+from routes.utils.pagination import decode_cursor, set_next_cursor
 
 from metrics import GENRE_VIEW_TOTAL
 
@@ -18,11 +19,18 @@ router = APIRouter(prefix="/genres", tags=["User"])
     summary="Get all genres"
 )
 async def get_genres(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session)
 ):
-    genres = await queries.get_genres(db, skip=skip, limit=limit)
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        skip = 0
+
+    genres = await queries.get_genres(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, [genre.id for genre in genres], limit)
     return genres
 
 
@@ -1,31 +1,211 @@
-import os
-from fastapi import APIRouter
-from elasticsearch import Elasticsearch
+import json
+from typing import List, Optional
 
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+
+from cache import search_cache
+from config import settings
+from elastic.client import get_es
+from elastic.documents import ENTRIES_INDEX, FRANCHISES_INDEX, PERSONS_INDEX, SUGGEST_INDEX, SUGGEST_KINDS
+from logger import logger
 from metrics import USER_SEARCH_TOTAL
+from routes.utils.entry import language_chain
+from routes.utils.pagination import NEXT_CURSOR_HEADER
+from routes.utils.search import (
+    FACET_AGGS, SEARCH_SORT, SearchCursor, SearchFilters, close_pit, decode_search_cursor, encode_search_cursor,
+    entries_text_query, execute_msearch, execute_search, facets_response, filter_clauses, franchises_text_query,
+    normalize_query, open_pit, persons_text_query, project_hit, search_filters, source_includes,
+)
 
 router = APIRouter(prefix="/search", tags=["User"])
 
-ELASTICSEARCH_URL = os.environ.get("ELASTICSEARCH_URL", "http://elasticsearch:9200")
-es = Elasticsearch(ELASTICSEARCH_URL)
+SUGGEST_MAX_LIMIT = 20
+COMBINED_MAX_LIMIT = 20
+
 
 @router.get("/")
-async def search_entries(query: str, limit: int = 10, offset: int = 0):
-    USER_SEARCH_TOTAL.labels(query_type="multi_match").inc()
+async def search_entries(
+    response: Response,
+    query: Optional[str] = None,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Курсор из X-Next-Cursor; с ним offset не используется"),
+    pit: bool = Query(False, description="Листать по снимку индекса (point-in-time): выдача не сдвигается от новых записей"),
+    lang: Optional[str] = Query(None, description="Языки через запятую: у каждого результата остаётся одна локаль"),
+    filters: SearchFilters = Depends(search_filters),
+    facets: bool = Query(False, description="Вернуть {results, total, facets} со счётчиками по жанрам, типу, статусу, рейтингу и году"),
+    es: AsyncElasticsearch = Depends(get_es)
+):
+    """Полнотекстовый поиск по entries; без query — просмотр каталога по фильтрам.
+
+    Глубокие страницы — по курсору (search_after): стоимость не растёт с глубиной
+    и не упирается в index.max_result_window.
+    Ответы без point-in-time кешируются до следующей записи sync_worker в индекс.
+    """
+    search_cursor = decode_search_cursor(cursor)
+    query = normalize_query(query)
+    languages = language_chain(lang) if lang else None
+    USER_SEARCH_TOTAL.labels(query_type="multi_match" if query else "filter").inc()
+
+    # ответ с point-in-time привязан к своему снимку индекса: его не кешируем
+    cache_key = None
+    if not pit and not (search_cursor and search_cursor.pit_id):
+        cache_key = search_cache.key((
+            query, filters, limit, search_cursor.after if search_cursor else offset, languages, facets,
+        ))
+    if cache_key:
+        cached = await search_cache.get(cache_key)
+        if cached is not None:
+            return cached_search_response(cached)
+        fill_token = search_cache.fill_token()
+
+    text_query = entries_text_query(query) if query else {"match_all": {}}
+
     query_body = {
-        "from": offset,
         "size": limit,
-        "query": {
-            "multi_match": {
-                "query": query,
-                "fields": [
-                    "locales.title^3",
-                    "locales.description^2",
-                    "staff_names_search^1"
-                ],
-                "type": "bool_prefix"
-            }
+        # список результатов: только поля карточки, без эпизодов и состава
+        "_source": {"includes": source_includes()},
+        "query": {"bool": {"must": [text_query], "filter": filter_clauses(filters)}},
+        "sort": SEARCH_SORT,
+    }
+    if search_cursor:
+        query_body["search_after"] = list(search_cursor.after)
+    else:
+        query_body["from"] = offset
+    if facets:
+        # счётчики фасетов в том же запросе, что и результаты
+        query_body["aggs"] = FACET_AGGS
+        query_body["track_total_hits"] = True
+
+    pit_id = search_cursor.pit_id if search_cursor else None
+    if pit and pit_id is None:
+        pit_id = await open_pit(es, ENTRIES_INDEX)
+    if pit_id:
+        query_body["pit"] = {"id": pit_id, "keep_alive": settings.SEARCH_PIT_KEEP_ALIVE}
+
+    try:
+        res = await execute_search(es, None if pit_id else ENTRIES_INDEX, query_body)
+    except NotFoundError:
+        if not pit_id:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search cursor has expired"
+        )
+
+    hits = res["hits"]["hits"]
+    next_cursor = None
+    if hits and len(hits) >= limit:
+        next_cursor = encode_search_cursor(SearchCursor(tuple(hits[-1]["sort"]), res.get("pit_id", pit_id)))
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    elif pit_id:
+        await close_pit(es, res.get("pit_id", pit_id))
+
+    results = [project_hit(hit["_source"], languages) for hit in hits]
+    if facets:
+        results = {
+            "results": results,
+            "total": res["hits"]["total"]["value"],
+            "facets": facets_response(res["aggregations"]),
         }
+    if cache_key:
+        cached = json.dumps({"content": jsonable_encoder(results), "next_cursor": next_cursor}).encode()
+        await search_cache.set(cache_key, cached, fill_token)
+    return results
+
+
+def cached_search_response(cached: bytes) -> Response:
+    payload = json.loads(cached)
+    headers = {NEXT_CURSOR_HEADER: payload["next_cursor"]} if payload["next_cursor"] else None
+    return Response(
+        content=json.dumps(payload["content"], ensure_ascii=False, separators=(",", ":")),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@router.get("/all")
+async def search_all(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(5, ge=1, le=COMBINED_MAX_LIMIT, description="Результатов в каждой группе"),
+    lang: Optional[str] = Query(None, description="Языки через запятую: у entries и франшиз остаётся одна локаль"),
+    es: AsyncElasticsearch = Depends(get_es)
+):
+    """Поиск сразу по entries, персонам и франшизам: один запрос _msearch, результаты по группам"""
+    query = normalize_query(query)
+    if query is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query is empty"
+        )
+    languages = language_chain(lang) if lang else None
+    USER_SEARCH_TOTAL.labels(query_type="combined").inc()
+
+    cache_key = search_cache.key(("all", query, limit, languages))
+    if cache_key:
+        cached = await search_cache.get(cache_key)
+        if cached is not None:
+            return cached_search_response(cached)
+        fill_token = search_cache.fill_token()
+
+    groups = {
+        "entries": (ENTRIES_INDEX, {
+            "size": limit,
+            "_source": {"includes": source_includes()},
+            "query": entries_text_query(query),
+        }),
+        "persons": (PERSONS_INDEX, {"size": limit, "query": persons_text_query(query)}),
+        "franchises": (FRANCHISES_INDEX, {"size": limit, "query": franchises_text_query(query)}),
     }
-    res = es.search(index="entries", body=query_body)
-    return [hit["_source"] for hit in res["hits"]["hits"]]
+    responses = await execute_msearch(es, list(groups.values()))
+
+    results = {}
+    failed = False
+    for (group, (index, _)), res in zip(groups.items(), responses):
+        # одна недоступная группа не роняет остальные
+        if "error" in res:
+            logger.warning(f"Combined search in '{index}' failed: {res['error']}")
+            results[group] = []
+            failed = True
+            continue
+        results[group] = [project_hit(hit["_source"], languages) for hit in res["hits"]["hits"]]
+
+    if cache_key and not failed:
+        cached = json.dumps({"content": jsonable_encoder(results), "next_cursor": None}).encode()
+        await search_cache.set(cache_key, cached, fill_token)
+    return results
+
+
+@router.get("/suggest")
+async def suggest(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT),
+    kind: Optional[List[str]] = Query(None, description="entry, franchise, person; по умолчанию все"),
+    es: AsyncElasticsearch = Depends(get_es)
+):
+    """Автодополнение по префиксу: id и строка для показа, без документов"""
+    # completion с контекстами без contexts в запросе обходит все подсказки
+    kinds = sorted(set(kind or SUGGEST_KINDS))
+    if set(kinds) - set(SUGGEST_KINDS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown kind: {', '.join(sorted(set(kinds) - set(SUGGEST_KINDS)))}"
+        )
+
+    USER_SEARCH_TOTAL.labels(query_type="suggest").inc()
+    completion = {"field": "suggest", "size": limit, "contexts": {"kind": kinds}}
+    query_body = {
+        # kind и id есть в _id подсказки: fetch-фаза не читает _source
+        "_source": False,
+        "suggest": {"titles": {"prefix": query, "completion": completion}},
+    }
+
+    res = await execute_search(es, SUGGEST_INDEX, query_body)
+
+    suggestions = []
+    for option in res["suggest"]["titles"][0]["options"]:
+        suggestion_kind, object_id = option["_id"].split(":")
+        suggestions.append({"kind": suggestion_kind, "id": int(object_id), "text": option["text"]})
+    return suggestions
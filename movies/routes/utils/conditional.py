@@ -0,0 +1,59 @@
+from typing import NamedTuple
+
+from fastapi import Request, Response, status
+
+from config import settings
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def make_etag(fingerprint: str) -> str:
+    return f'"{fingerprint}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Проверка условного GET только по If-None-Match.
+
+    Last-Modified не отдаётся, а If-Modified-Since не учитывается: у локалей,
+    жанров, состава и эпизодов нет своего updated_at, а удаление строки
+    вообще не оставляет времени. Версию ответа отражает только ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    return _etag_matches(if_none_match, etag)
+
+
+def _validator_headers(etag: str) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+    }
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=_validator_headers(etag),
+    )
+
+
+def conditional_response(request: Request, cached: CachedResponse) -> Response:
+    if is_not_modified(request, cached.etag):
+        return not_modified_response(cached.etag)
+
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers=_validator_headers(cached.etag),
+    )
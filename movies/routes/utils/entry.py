@@ -1,53 +1,141 @@
+import hashlib
+from typing import FrozenSet, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from schemas import EpisodeLocaleResponse, EpisodeResponse
+from config import settings
 from db import queries
+from db.models import StaffRole
 from schemas.entry import EntryResponse
-from schemas.entry_locale import EntryLocaleResponse
-from schemas.entry_staff import EntryStaffResponse
-from schemas.genre import GenreResponse
-
-
-async def load_entry_details(db: AsyncSession, entry_id: int) -> EntryResponse | None:
-    db_entry = await queries.get_entry(db, entry_id)
-    if not db_entry:
-        return None
-
-    entry_schema = EntryResponse.model_validate(db_entry)
-
-    locales = await queries.get_entry_locales_by_entry(db, entry_id)
-    entry_schema.locales = [EntryLocaleResponse.model_validate(loc) for loc in locales]
-
-    genres = await queries.get_entry_genres(db, entry_id)
-    entry_schema.genres = [GenreResponse.model_validate(g) for g in genres]
-
-    staff_with_persons = await queries.get_entry_staff(db, entry_id)
-    entry_schema.staff = []
-    for es, person in staff_with_persons:
-        staff_member_schema = EntryStaffResponse(
-            entry_id=es.entry_id,
-            person_id=es.person_id,
-            role=es.role,
-            character_name=es.character_name,
-        )
-        entry_schema.staff.append(staff_member_schema)
-
-    db_episodes = await queries.get_episodes_by_entry(db, entry_id)
-    entry_schema.episodes = []
-    for db_episode in db_episodes:
-        episode_brief = EpisodeResponse(
-            id=db_episode.id,
-            entry_id=db_episode.entry_id,
-            episode_number=db_episode.episode_number,
-            duration=db_episode.duration,
-            premiere_world=db_episode.premiere_world,
-            premiere_digital=db_episode.premiere_digital,
-            created_at=db_episode.created_at,
-            locales=[
-                EpisodeLocaleResponse.model_validate(loc)
-                for loc in db_episode.locales
-            ]
-        )
-        entry_schema.episodes.append(episode_brief)
-
-    return entry_schema
+
+ENTRY_FIELDS = tuple(EntryResponse.model_fields)
+# без ?include= отдаются все связи; с ним — лёгкие всегда, тяжёлые только перечисленные
+OPTIONAL_RELATIONS = ("staff", "episodes")
+
+_entries_adapter = TypeAdapter(List[EntryResponse])
+
+
+class EntryView(NamedTuple):
+    """Какую часть entry отдать клиенту: языки, связи и поля ответа"""
+    languages: Optional[Tuple[str, ...]] = None
+    relations: FrozenSet[str] = frozenset(queries.ENTRY_RELATIONS)
+    fields: FrozenSet[str] = frozenset(ENTRY_FIELDS)
+
+    @property
+    def is_default(self) -> bool:
+        return self == EntryView()
+
+    def etag_fingerprint(self, fingerprint: str) -> str:
+        """Разные представления одной версии entry должны иметь разные ETag"""
+        if self.is_default:
+            return fingerprint
+        view_key = repr((self.languages, sorted(self.relations), sorted(self.fields)))
+        return f"{fingerprint}-{hashlib.md5(view_key.encode()).hexdigest()[:8]}"
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def language_chain(lang: str) -> Tuple[str, ...]:
+    chain: List[str] = []
+    for language in _split(lang) + _split(settings.FALLBACK_LANGUAGES):
+        # "pt-BR" без своей локали может получить "pt"
+        for candidate in (language, language.split("-")[0]):
+            if candidate not in chain:
+                chain.append(candidate)
+    return tuple(chain)
+
+
+def _unknown(kind: str, names: set) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unknown {kind}: {', '.join(sorted(names))}"
+    )
+
+
+def entry_view(
+    lang: Optional[str] = Query(None, description="Языки через запятую, например uk,ru; дальше идёт FALLBACK_LANGUAGES"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую, например id,type,locales"),
+    include: Optional[str] = Query(None, description="Тяжёлые связи через запятую: staff, episodes"),
+) -> EntryView:
+    """Разобрать ?lang=, ?fields=, ?include=; неиспользуемые связи не выбираются из БД"""
+    view = EntryView()
+
+    if lang:
+        view = view._replace(languages=language_chain(lang))
+
+    if include is not None:
+        included = set(_split(include))
+        if included - set(OPTIONAL_RELATIONS):
+            raise _unknown("include", included - set(OPTIONAL_RELATIONS))
+        view = view._replace(relations=view.relations - (set(OPTIONAL_RELATIONS) - included))
+
+    if fields is not None:
+        requested = set(_split(fields)) | {"id"}
+        if requested - set(ENTRY_FIELDS):
+            raise _unknown("fields", requested - set(ENTRY_FIELDS))
+        view = view._replace(fields=frozenset(requested), relations=view.relations & requested)
+
+    return view._replace(fields=view.fields - (set(queries.ENTRY_RELATIONS) - view.relations))
+
+
+def build_entry_response(row: Row) -> EntryResponse:
+    """Собрать EntryResponse из строки queries.get_entry_details / get_entries_details.
+
+    Связи, которых нет в строке, остаются пустыми; из ответа их убирает EntryView.fields.
+    """
+    db_entry = row.Entry
+    relations = row._mapping
+    return EntryResponse(
+        id=db_entry.id,
+        franchise_id=db_entry.franchise_id,
+        type=db_entry.type,
+        status=db_entry.status,
+        rating_mpaa=db_entry.rating_mpaa,
+        age_rating=db_entry.age_rating,
+        entry_number=db_entry.entry_number,
+        duration=db_entry.duration,
+        premiere_world=db_entry.premiere_world,
+        premiere_digital=db_entry.premiere_digital,
+        created_at=db_entry.created_at,
+        updated_at=db_entry.updated_at,
+        locales=relations.get("locales", []),
+        genres=relations.get("genres", []),
+        # в JSON enum приходит меткой Postgres (имя члена), а не значением
+        staff=[
+            {**member, "role": StaffRole[member["role"]].value}
+            for member in relations.get("staff", [])
+        ],
+        episodes=relations.get("episodes", []),
+    )
+
+
+def dump_entry(entry: EntryResponse, view: EntryView) -> bytes:
+    return entry.model_dump_json(include=set(view.fields)).encode()
+
+
+def entries_response(entries: List[EntryResponse], view: EntryView) -> Response:
+    return Response(
+        content=_entries_adapter.dump_json(entries, include={"__all__": set(view.fields)}),
+        media_type="application/json",
+    )
+
+
+async def load_entries_details(db: AsyncSession, entry_ids: List[int], view: EntryView = EntryView()) -> List[EntryResponse]:
+    rows = await queries.get_entry_details(db, entry_ids, relations=view.relations, languages=view.languages)
+    rows_by_id = {row.Entry.id: row for row in rows}
+
+    return [
+        build_entry_response(rows_by_id[entry_id])
+        for entry_id in entry_ids
+        if entry_id in rows_by_id
+    ]
+
+
+async def load_entry_details(db: AsyncSession, entry_id: int, view: EntryView = EntryView()) -> EntryResponse | None:
+    entries = await load_entries_details(db, [entry_id], view)
+    return entries[0] if entries else None
@@ -0,0 +1,50 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_token(payload: dict) -> str:
+    """Непрозрачная для клиента строка: JSON в base64url без padding"""
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_token(token: str) -> Optional[dict]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def encode_cursor(last_id: int) -> str:
+    return encode_token({"id": last_id})
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Вернуть id, после которого начинается страница, или None для первой страницы"""
+    if not cursor:
+        return None
+
+    last_id = (decode_token(cursor) or {}).get("id")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise invalid_cursor()
+    return last_id
+
+
+def set_next_cursor(response: Response, ids: Sequence[int], limit: int) -> None:
+    """Отдать курсор следующей страницы в заголовке, если текущая страница заполнена"""
+    if ids and len(ids) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ids[-1])
@@ -0,0 +1,255 @@
+import unicodedata
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch, ConnectionError as ESConnectionError, ConnectionTimeout
+from fastapi import HTTPException, Query, status
+
+from config import settings
+from db.models import ContentStatus, EntryType, MPAARating
+from elastic.client import search_slot
+from routes.utils.pagination import decode_token, encode_token, invalid_cursor
+
+# сколько значений фасета отдавать; жанров в каталоге десятки
+FACET_SIZE = 50
+
+# id — уникальный tiebreaker: при равной релевантности порядок между страницами не меняется
+SEARCH_SORT = [{"_score": "desc"}, {"id": "asc"}]
+
+
+def normalize_query(query: Optional[str]) -> Optional[str]:
+    """Запрос без различий, которые не меняют выдачу: форма юникода, регистр, пробелы"""
+    if query is None:
+        return None
+    query = " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+    return query or None
+
+
+def entries_text_query(query: str) -> dict:
+    return {
+        "multi_match": {
+            "query": query,
+            "fields": [
+                "locales.title.prefix^3",
+                "locales.title.ru^3",
+                "locales.title.en^3",
+                "locales.description.ru^2",
+                "locales.description.en^2",
+                "staff_names_search.prefix^1"
+            ],
+            "type": "best_fields",
+            "tie_breaker": 0.3
+        }
+    }
+
+
+def persons_text_query(query: str) -> dict:
+    return {
+        "multi_match": {
+            "query": query,
+            "fields": ["name^2", "en_name^2", "name.prefix", "en_name.prefix"],
+            "type": "best_fields",
+        }
+    }
+
+
+def franchises_text_query(query: str) -> dict:
+    return {
+        "multi_match": {
+            "query": query,
+            "fields": ["locales.title.prefix", "locales.title.ru", "locales.title.en"],
+            "type": "best_fields",
+        }
+    }
+
+
+class SearchFilters(NamedTuple):
+    """Фильтры поиска; значения отсортированы, чтобы одинаковые фильтры давали одинаковый запрос"""
+    genre_ids: Tuple[int, ...] = ()
+    types: Tuple[str, ...] = ()
+    statuses: Tuple[str, ...] = ()
+    ratings: Tuple[str, ...] = ()
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+
+
+def search_filters(
+    genre: Optional[List[int]] = Query(None, description="ID жанров; подходит entry с любым из них"),
+    entry_type: Optional[List[EntryType]] = Query(None, alias="type"),
+    entry_status: Optional[List[ContentStatus]] = Query(None, alias="status"),
+    rating: Optional[List[MPAARating]] = Query(None, description="Рейтинг MPAA"),
+    year_from: Optional[int] = Query(None, description="Год мировой премьеры, от (включительно)"),
+    year_to: Optional[int] = Query(None, description="Год мировой премьеры, до (включительно)"),
+) -> SearchFilters:
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="year_from is greater than year_to"
+        )
+    return SearchFilters(
+        genre_ids=tuple(sorted(set(genre or ()))),
+        types=tuple(sorted({value.value for value in entry_type or ()})),
+        statuses=tuple(sorted({value.value for value in entry_status or ()})),
+        ratings=tuple(sorted({value.value for value in rating or ()})),
+        year_from=year_from,
+        year_to=year_to,
+    )
+
+
+def filter_clauses(filters: SearchFilters) -> List[dict]:
+    """Условия для bool.filter: не влияют на релевантность и кешируются в ES"""
+    clauses = []
+    if filters.genre_ids:
+        clauses.append({
+            "nested": {"path": "genres", "query": {"terms": {"genres.id": list(filters.genre_ids)}}}
+        })
+    for field, values in (("type", filters.types), ("status", filters.statuses), ("rating_mpaa", filters.ratings)):
+        if values:
+            clauses.append({"terms": {field: list(values)}})
+    if filters.year_from is not None or filters.year_to is not None:
+        year_range = {}
+        if filters.year_from is not None:
+            year_range["gte"] = filters.year_from
+        if filters.year_to is not None:
+            year_range["lte"] = filters.year_to
+        clauses.append({"range": {"year": year_range}})
+    return clauses
+
+
+# счётчики считаются по результатам с уже применёнными фильтрами
+FACET_AGGS = {
+    "genres": {
+        "nested": {"path": "genres"},
+        "aggs": {
+            "ids": {
+                "terms": {"field": "genres.id", "size": FACET_SIZE},
+                "aggs": {"name": {"terms": {"field": "genres.name", "size": 1}}},
+            },
+        },
+    },
+    "type": {"terms": {"field": "type", "size": FACET_SIZE}},
+    "status": {"terms": {"field": "status", "size": FACET_SIZE}},
+    "rating": {"terms": {"field": "rating_mpaa", "size": FACET_SIZE}},
+    "year": {"histogram": {"field": "year", "interval": 1, "min_doc_count": 1}},
+}
+
+
+def facets_response(aggregations: dict) -> dict:
+    facets = {
+        "genres": [
+            {
+                "id": bucket["key"],
+                "name": next((name["key"] for name in bucket["name"]["buckets"]), None),
+                "count": bucket["doc_count"],
+            }
+            for bucket in aggregations["genres"]["ids"]["buckets"]
+        ],
+        "year": [
+            {"value": int(bucket["key"]), "count": bucket["doc_count"]}
+            for bucket in aggregations["year"]["buckets"]
+        ],
+    }
+    for name in ("type", "status", "rating"):
+        facets[name] = [
+            {"value": bucket["key"], "count": bucket["doc_count"]}
+            for bucket in aggregations[name]["buckets"]
+        ]
+    return facets
+
+
+def source_includes() -> List[str]:
+    return [field.strip() for field in settings.SEARCH_SOURCE_FIELDS.split(",") if field.strip()]
+
+
+def project_hit(source: dict, languages: Optional[Tuple[str, ...]]) -> dict:
+    """Найденный документ для выдачи; с ?lang= из локалей остаётся одна, лучшая по цепочке языков"""
+    locales = source.get("locales")
+    if languages and locales:
+        rank = {language: position for position, language in enumerate(languages)}
+        best = min(locales, key=lambda locale: rank.get(locale.get("language"), len(rank)))
+        source = {**source, "locales": [best]}
+    return source
+
+
+class SearchCursor(NamedTuple):
+    """Позиция в выдаче: sort-значения последнего результата и point-in-time, если он открыт"""
+    after: Tuple
+    pit_id: Optional[str] = None
+
+
+def encode_search_cursor(cursor: SearchCursor) -> str:
+    payload = {"after": list(cursor.after)}
+    if cursor.pit_id:
+        payload["pit"] = cursor.pit_id
+    return encode_token(payload)
+
+
+def decode_search_cursor(cursor: Optional[str]) -> Optional[SearchCursor]:
+    if not cursor:
+        return None
+
+    payload = decode_token(cursor) or {}
+    after, pit_id = payload.get("after"), payload.get("pit")
+    if (
+        not isinstance(after, list)
+        or len(after) != len(SEARCH_SORT)
+        or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in after)
+        or not isinstance(pit_id, (str, type(None)))
+    ):
+        raise invalid_cursor()
+    return SearchCursor(tuple(after), pit_id)
+
+
+@contextmanager
+def search_errors() -> Iterator[None]:
+    """Недоступность ES — 503/504, а не 500"""
+    try:
+        yield
+    except ConnectionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Search timed out"
+        )
+    except ESConnectionError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search is not available"
+        )
+
+
+async def execute_search(es: AsyncElasticsearch, index: Optional[str], body: dict) -> dict:
+    """Поиск через общий лимит параллельных запросов; с point-in-time index не указывается"""
+    async with search_slot():
+        with search_errors():
+            return await es.search(index=index, body=body)
+
+
+async def execute_msearch(es: AsyncElasticsearch, searches: List[Tuple[str, dict]]) -> List[dict]:
+    """Несколько поисков одним запросом _msearch; ответы — в порядке searches.
+
+    Ответ с ошибкой (например, индекса ещё нет) возвращается как есть:
+    что с ним делать, решает вызывающий.
+    """
+    body = []
+    for index, search in searches:
+        body += [{"index": index}, search]
+    async with search_slot():
+        with search_errors():
+            result = await es.msearch(searches=body)
+    return result["responses"]
+
+
+async def open_pit(es: AsyncElasticsearch, index: str) -> str:
+    async with search_slot():
+        with search_errors():
+            result = await es.open_point_in_time(index=index, keep_alive=settings.SEARCH_PIT_KEEP_ALIVE)
+    return result["id"]
+
+
+async def close_pit(es: AsyncElasticsearch, pit_id: str) -> None:
+    # не закрытый явно point-in-time сам истечёт через SEARCH_PIT_KEEP_ALIVE
+    try:
+        async with search_slot():
+            await es.close_point_in_time(id=pit_id)
+    except Exception:
+        pass
@@ -25,3 +25,6 @@ from .person import (
 from .entry_staff import (
     EntryStaffCreateRequest, EntryStaffUpdateRequest, EntryStaffResponse,
 )
+from .entry_card import (
+    EntryCardResponse,
+)
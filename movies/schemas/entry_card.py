@@ -0,0 +1,15 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class EntryCardResponse(BaseModel):
+    id: int = Field(..., example=1, validation_alias="entry_id")
+    franchise_id: int = Field(..., example=1)
+    type: str = Field(..., example="film")
+    status: str = Field(..., example="finished")
+    year: Optional[int] = Field(None, example=2023, description="Год мировой премьеры")
+    titles: Dict[str, str] = Field(..., example={"ru": "Мстители: Финал", "en": "Avengers: Endgame"})
+    genres: List[str] = Field(..., example=["Фантастика", "Боевик"])
+
+    class Config:
+        from_attributes = True
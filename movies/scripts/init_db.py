@@ -4,64 +4,243 @@ from sqlalchemy import text
 from db.models import Base
 from config import settings
 
+# Откуда триггер берёт id затронутых entries: запрос к переходной таблице
+# оператора (%1$s — new_rows или old_rows).
+ENTRY_CHANGE_SOURCES = {
+    "entries": "SELECT id FROM %1$s",
+    "entry_locales": "SELECT entry_id FROM %1$s",
+    "entry_staff": "SELECT entry_id FROM %1$s",
+    "entry_genres": "SELECT entry_id FROM %1$s",
+    "episodes": "SELECT entry_id FROM %1$s",
+    "episode_locales": "SELECT ep.entry_id FROM %1$s AS r JOIN episodes AS ep ON ep.id = r.episode_id",
+}
+
+# Сущности, общие для многих entries: в журнал related_changes пишется id
+# самой сущности, а sync_worker раскрывает его в entries и обновляет только
+# зависящие от неё поля документов.
+RELATED_CHANGE_SOURCES = {
+    # вставка и удаление персоны меняют только автодополнение: её строки в entry_staff пишут в entry_changes
+    "persons": ("person", "SELECT id FROM %1$s", ("INSERT", "UPDATE", "DELETE")),
+    "genres": ("genre", "SELECT id FROM %1$s", ("UPDATE",)),
+    "franchise_locales": ("franchise", "SELECT franchise_id FROM %1$s", ("INSERT", "UPDATE", "DELETE")),
+}
+
+# Источники карточек entry_cards и операции, на которые карточку нужно пересобрать.
+# Удаление entry убирает карточку через ON DELETE CASCADE, удаление жанра — через каскад entry_genres.
+ENTRY_CARD_SOURCES = {
+    "entries": ("SELECT id FROM %1$s", ("INSERT", "UPDATE")),
+    "entry_locales": ("SELECT entry_id FROM %1$s", ("INSERT", "UPDATE", "DELETE")),
+    "entry_genres": ("SELECT entry_id FROM %1$s", ("INSERT", "UPDATE", "DELETE")),
+    "genres": ("SELECT eg.entry_id FROM %1$s AS g JOIN entry_genres AS eg ON eg.genre_id = g.id", ("UPDATE",)),
+}
+
+TRANSITION_TABLES = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "NEW TABLE AS new_rows OLD TABLE AS old_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+# Общая часть триггерных функций: собрать различные id entries, затронутых
+# оператором. Переходные таблицы видны только внутри самой триггерной функции,
+# поэтому фрагмент вставляется в каждую из них.
+CHANGED_ENTRY_IDS_SQL = """
+            key_query := CASE TG_OP
+                WHEN 'INSERT' THEN format(TG_ARGV[0], 'new_rows')
+                WHEN 'DELETE' THEN format(TG_ARGV[0], 'old_rows')
+                ELSE format(TG_ARGV[0], 'new_rows') || ' UNION ' || format(TG_ARGV[0], 'old_rows')
+            END;
+            EXECUTE 'SELECT array_agg(DISTINCT entry_id ORDER BY entry_id) FROM ('
+                || key_query || ') AS changed(entry_id) WHERE entry_id IS NOT NULL'
+                INTO changed_ids;
+"""
+
+
+async def create_statement_triggers(conn, prefix: str, function: str, table: str,
+                                    key_query: str, operations=("INSERT", "UPDATE", "DELETE"),
+                                    extra_args=()):
+    args = ", ".join(f"'{arg}'" for arg in (key_query, *extra_args))
+    # переходные таблицы нельзя объявить у триггера на несколько операций сразу
+    for operation in operations:
+        await conn.execute(text(f"""
+        CREATE OR REPLACE TRIGGER {table}_{prefix}_{operation.lower()}
+        AFTER {operation} ON {table}
+        REFERENCING {TRANSITION_TABLES[operation]}
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}({args});
+        """))
+
+
 async def init_db():
     engine = create_async_engine(settings.DATABASE_URL, echo=True)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-        await conn.execute(text("""
-        CREATE OR REPLACE FUNCTION notify_entry_change_main() RETURNS trigger AS $$
+        # построчные триггеры прежних версий
+        for tname in ENTRY_CHANGE_SOURCES:
+            trigger = "entry_changed_trg" if tname == "entries" else f"{tname}_changed_trg"
+            await conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON {tname}"))
+        await conn.execute(text("DROP TRIGGER IF EXISTS franchise_locales_changed_trg ON franchise_locales"))
+        for tname in ENTRY_CARD_SOURCES:
+            await conn.execute(text(f"DROP TRIGGER IF EXISTS {tname}_card_trg ON {tname}"))
+        # правки франшиз раньше раскрывались в entries прямо в триггере
+        for operation in ("insert", "update", "delete"):
+            await conn.execute(text(f"DROP TRIGGER IF EXISTS franchise_locales_changes_{operation} ON franchise_locales"))
+        await conn.execute(text("DROP FUNCTION IF EXISTS notify_entry_change_main()"))
+        await conn.execute(text("DROP FUNCTION IF EXISTS notify_entry_change_related()"))
+        await conn.execute(text("DROP FUNCTION IF EXISTS refresh_entry_card_trg()"))
+
+        # Изменения пишутся в журнал entry_changes (его читает sync_worker),
+        # а NOTIFY только будит воркер и сбрасывает кеш ответов API.
+        # Триггеры уровня оператора: одна строка журнала и одно уведомление
+        # на каждый различный entry, сколько бы строк ни затронул оператор.
+        # Уведомление 'entry_id:franchise_id' (у удалённого entry франшизы нет):
+        # API сбрасывает кеш франшизы без запроса к базе.
+        await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION log_entry_changes() RETURNS trigger AS $$
+        DECLARE
+            key_query text;
+            changed_ids integer[];
+            changed_id integer;
+            changed_franchise_id integer;
         BEGIN
-            PERFORM pg_notify('entry_changed', COALESCE(NEW.id, OLD.id)::text);
-            RETURN NEW;
+            {CHANGED_ENTRY_IDS_SQL}
+            IF changed_ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO entry_changes (entry_id) SELECT unnest(changed_ids);
+            FOR changed_id, changed_franchise_id IN
+                SELECT c.id, e.franchise_id
+                  FROM unnest(changed_ids) AS c(id)
+                  LEFT JOIN entries e ON e.id = c.id
+            LOOP
+                PERFORM pg_notify('entry_changed', changed_id || ':' || COALESCE(changed_franchise_id::text, ''));
+            END LOOP;
+            RETURN NULL;
         END;
         $$ LANGUAGE plpgsql;
         """))
 
-        await conn.execute(text("""
-        CREATE OR REPLACE FUNCTION notify_entry_change_related() RETURNS trigger AS $$
+        for tname, key_query in ENTRY_CHANGE_SOURCES.items():
+            await create_statement_triggers(conn, "changes", "log_entry_changes", tname, key_query)
+
+        # Персоны, жанры и франшизы: одна строка журнала на сущность, а не на
+        # каждый entry, где она встречается. Сущность передаётся вторым
+        # аргументом триггера, уведомление — 'entity:id'.
+        await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION log_related_changes() RETURNS trigger AS $$
+        DECLARE
+            key_query text;
+            changed_ids integer[];
+            changed_id integer;
         BEGIN
-            PERFORM pg_notify('entry_changed', COALESCE(NEW.entry_id, OLD.entry_id)::text);
-            RETURN NEW;
+            {CHANGED_ENTRY_IDS_SQL}
+            IF changed_ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO related_changes (entity, entity_id) SELECT TG_ARGV[1], unnest(changed_ids);
+            FOREACH changed_id IN ARRAY changed_ids LOOP
+                PERFORM pg_notify('related_changed', TG_ARGV[1] || ':' || changed_id);
+            END LOOP;
+            RETURN NULL;
         END;
         $$ LANGUAGE plpgsql;
         """))
 
+        for tname, (entity, key_query, operations) in RELATED_CHANGE_SOURCES.items():
+            await create_statement_triggers(
+                conn, "related", "log_related_changes", tname, key_query, operations, extra_args=(entity,)
+            )
+
+        # Строка франшизы без локалей и entries не пишет ни в один журнал:
+        # её изменение только сбрасывает кеш ответа франшизы в API.
+        await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION notify_franchise_changes() RETURNS trigger AS $$
+        DECLARE
+            key_query text;
+            changed_ids integer[];
+            changed_id integer;
+        BEGIN
+            {CHANGED_ENTRY_IDS_SQL}
+            IF changed_ids IS NOT NULL THEN
+                FOREACH changed_id IN ARRAY changed_ids LOOP
+                    PERFORM pg_notify('franchise_changed', changed_id::text);
+                END LOOP;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """))
+
+        await create_statement_triggers(
+            conn, "notify", "notify_franchise_changes", "franchises", "SELECT id FROM %1$s", ("UPDATE", "DELETE")
+        )
+
+        # Денормализованные карточки для каталога (таблица entry_cards).
+        # Карточка пересобирается целиком по entry_id в той же транзакции,
+        # что и изменение исходных строк.
         await conn.execute(text("""
-        DO $$
+        CREATE OR REPLACE FUNCTION refresh_entry_cards(p_entry_ids integer[]) RETURNS void AS $$
         BEGIN
-            IF NOT EXISTS (
-                SELECT 1 FROM pg_trigger WHERE tgname = 'entry_changed_trg'
-            ) THEN
-                CREATE TRIGGER entry_changed_trg
-                AFTER INSERT OR UPDATE OR DELETE ON entries
-                FOR EACH ROW EXECUTE FUNCTION notify_entry_change_main();
+            INSERT INTO entry_cards (entry_id, franchise_id, type, status, year, titles, genres, updated_at)
+            SELECT
+                e.id,
+                e.franchise_id,
+                e.type,
+                e.status,
+                EXTRACT(YEAR FROM e.premiere_world)::smallint,
+                COALESCE((
+                    SELECT jsonb_object_agg(l.language, l.title ORDER BY l.id)
+                    FROM entry_locales l
+                    WHERE l.entry_id = e.id
+                ), '{}'::jsonb),
+                ARRAY(
+                    SELECT g.name
+                    FROM entry_genres eg
+                    JOIN genres g ON g.id = eg.genre_id
+                    WHERE eg.entry_id = e.id
+                    ORDER BY g.name
+                ),
+                e.updated_at
+            FROM entries e
+            WHERE e.id = ANY(p_entry_ids)
+            ON CONFLICT (entry_id) DO UPDATE SET
+                franchise_id = EXCLUDED.franchise_id,
+                type = EXCLUDED.type,
+                status = EXCLUDED.status,
+                year = EXCLUDED.year,
+                titles = EXCLUDED.titles,
+                genres = EXCLUDED.genres,
+                updated_at = EXCLUDED.updated_at;
+        END;
+        $$ LANGUAGE plpgsql;
+        """))
+
+        await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION refresh_changed_entry_cards() RETURNS trigger AS $$
+        DECLARE
+            key_query text;
+            changed_ids integer[];
+        BEGIN
+            {CHANGED_ENTRY_IDS_SQL}
+            IF changed_ids IS NOT NULL THEN
+                PERFORM refresh_entry_cards(changed_ids);
             END IF;
-        END $$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
         """))
 
-        related_tables = [
-            "entry_locales",
-            "entry_staff",
-            "entry_genres",
-            "episodes",
-            "episode_locales",
-            "franchise_locales",
-        ]
-
-        for tname in related_tables:
-            await conn.execute(text(f"""
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1 FROM pg_trigger WHERE tgname = '{tname}_changed_trg'
-                ) THEN
-                    CREATE TRIGGER {tname}_changed_trg
-                    AFTER INSERT OR UPDATE OR DELETE ON {tname}
-                    FOR EACH ROW EXECUTE FUNCTION notify_entry_change_related();
-                END IF;
-            END $$;
-            """))
+        for tname, (key_query, operations) in ENTRY_CARD_SOURCES.items():
+            await create_statement_triggers(conn, "cards", "refresh_changed_entry_cards", tname, key_query, operations)
+
+        # карточки для entries, созданных до появления триггеров
+        await conn.execute(text("""
+        SELECT refresh_entry_cards(ARRAY(
+            SELECT e.id FROM entries e
+            WHERE NOT EXISTS (SELECT 1 FROM entry_cards c WHERE c.entry_id = e.id)
+        ));
+        """))
 
     await engine.dispose()
     print("Database initialized successfully!")
@@ -1,13 +1,33 @@
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 
 from config import settings
+from metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_SIZE, DB_POOL_WAIT_SECONDS
+
+
+class _TimedQueue(AsyncAdaptedQueue):
+    def get(self, block: bool = True, timeout: float | None = None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул asyncpg-соединений, который замеряет ожидание свободного соединения"""
+    _queue_class = _TimedQueue
 
 
 class SessionManager:
     def __init__(self) -> None:
-        self.refresh()
+        if not hasattr(self, "engine"):
+            self.refresh()
 
     def __new__(cls):
         if not hasattr(cls, "instance"):
@@ -15,10 +35,27 @@ class SessionManager:
         return cls.instance
 
     def get_session_maker(self) -> sessionmaker:
-        return sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        return self.session_maker
 
     def refresh(self) -> None:
-        self.engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+        self.engine = create_async_engine(
+            settings.DATABASE_URL,
+            echo=settings.DB_ECHO,
+            future=True,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+        )
+        self.session_maker = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+        pool = self.engine.pool
+        DB_POOL_SIZE.set_function(pool.size)
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
 
 
 async def get_session() -> AsyncSession: